@@ -151,19 +151,9 @@ def publish_behavior(event_node):
 	print "(Behavior event:", event_node.name, ")"
 	return TruthValue(1, 1)
 
-def explore_saccade():
-	print "(Eva switches to explore saccade)"
-	# evl.explore_saccade()
-	return TruthValue(1, 1)
-
-def conversational_saccade():
-	print "(Eva switches to conversational saccade)"
-	# evl.conversational_saccade()
-	return TruthValue(1, 1)
-
-def listening_saccade():
-	print "(Eva switches to listening saccade)"
-	# evl.conversational_saccade()
+def saccade(profile_node):
+	print "(Eva switches to " + profile_node.name + " saccade)"
+	# evl.saccade(profile_node.name)
 	return TruthValue(1, 1)
 
 def blink_rate(mean_node, var_node):
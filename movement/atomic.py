@@ -106,19 +106,11 @@ def publish_behavior(event_node):
 	evl.publish_behavior(event_node.name)
 	return TruthValue(1, 1)
 
-def explore_saccade():
-	print "Python: Explore Saccade"
-	evl.explore_saccade()
-	return TruthValue(1, 1)
-
-def conversational_saccade():
-	print "Python: Conversational Saccade"
-	evl.conversational_saccade()
-	return TruthValue(1, 1)
-
-def listening_saccade():
-	print "Python: Listening Saccade"
-	evl.listening_saccade()
+# Start the eye-saccade cycle named by the profile node, e.g.
+# (Concept "explore"); the profiles are in saccade-profiles.yaml.
+def saccade(profile_node):
+	print "Python: Saccade", profile_node.name
+	evl.saccade(profile_node.name)
 	return TruthValue(1, 1)
 
 def blink_rate(mean_node, var_node):
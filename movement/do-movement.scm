@@ -65,34 +65,49 @@
 
 ; -------------------------------------------------------------
 ; Eye-saccade control.
-; (cog-evaluate! (Put (DefinedPredicate "Say") (Node "this is a test"))))
+; The profile is the name of one of the saccade profiles in
+; saccade-profiles.yaml; new profiles can be added there, without
+; any change here.
+;
+; Example usage:
+;    (cog-evaluate! (Put (DefinedPredicate "Saccade") (Concept "explore")))
 
+(delete-definition "Saccade")
 (delete-definition "Conversational Saccade")
 (delete-definition "Listening Saccade")
 (delete-definition "Explore Saccade")
 
+(DefineLink
+	(DefinedPredicate "Saccade")
+	(LambdaLink
+		(Variable "$profile")
+		(Evaluation
+			(GroundedPredicate "py: saccade")
+			(List (Variable "$profile")))
+	))
+
 (DefineLink
 	(DefinedPredicate "Conversational Saccade")
 	(LambdaLink
 		(Evaluation
-			(GroundedPredicate "py: conversational_saccade")
-			(List))
+			(GroundedPredicate "py: saccade")
+			(List (Concept "conversational")))
 	))
 
 (DefineLink
 	(DefinedPredicate "Listening Saccade")
 	(LambdaLink
 		(Evaluation
-			(GroundedPredicate "py: listening_saccade")
-			(List))
+			(GroundedPredicate "py: saccade")
+			(List (Concept "listening")))
 	))
 
 (DefineLink
 	(DefinedPredicate "Explore Saccade")
 	(LambdaLink
 		(Evaluation
-			(GroundedPredicate "py: explore_saccade")
-			(List))
+			(GroundedPredicate "py: saccade")
+			(List (Concept "explore")))
 	))
 
 ; -------------------------------------------------------------
@@ -17,6 +17,7 @@
 # Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import os
 import rosmsg
 import rospy
 import roslib
@@ -25,6 +26,8 @@ import logging
 import random
 import tf
 import numpy
+import threading
+import yaml
 # Eva ROS message imports
 from std_msgs.msg import String, Int32
 from blender_api_msgs.msg import AvailableEmotionStates, AvailableGestures
@@ -40,6 +43,55 @@ from hr_msgs.msg import ChatMessage
 
 logger = logging.getLogger('hr.OpenCog_Eva')
 
+# The psi rules can fire expressions, gestures and gaze targets at
+# high rates, and making a fresh ROS message for each one adds up.
+# A MessagePool hands out message instances, round-robin, from a few
+# that were made up-front; the caller fills in the fields and publishes.
+#
+# rospy serializes a message inside publish(), so in principle one
+# instance per publisher would do.  A few are rotated anyway, so that
+# two threads publishing at the same time (the atomspace runs python
+# from several) are not both filling in the same instance.
+class MessagePool:
+	def __init__(self, msg_class, size=4):
+		self.msgs = [msg_class() for i in range(size)]
+		self.next = 0
+		self.lock = threading.Lock()
+
+	def get(self):
+		with self.lock:
+			msg = self.msgs[self.next]
+			self.next = (self.next + 1) % len(self.msgs)
+		return msg
+
+# The saccade parameter sets ("profiles") are data, not code: they are
+# read from saccade-profiles.yaml (next to this file), or from the ROS
+# parameter /opencog/saccade_profiles, if that is set.  The SaccadeCycle
+# message for each profile is built once, when the profiles are loaded,
+# and then re-published as-is.
+SACCADE_PROFILES_FILE = os.path.join(os.path.dirname(
+	os.path.abspath(__file__)), "saccade-profiles.yaml")
+
+def make_saccade_msg(profile):
+	msg = SaccadeCycle()
+	for (field, value) in profile.items():
+		if field not in msg.__slots__:
+			raise ValueError("SaccadeCycle has no field " + field)
+		setattr(msg, field, value)
+	return msg
+
+# Returns a dict of profile name to prebuilt SaccadeCycle message.
+# Raises an exception if the profiles cannot be read, or are malformed.
+def load_saccade_msgs():
+	profiles = rospy.get_param("/opencog/saccade_profiles", None)
+	if profiles is None:
+		path = rospy.get_param("/opencog/saccade_profiles_file",
+			SACCADE_PROFILES_FILE)
+		with open(path) as f:
+			profiles = yaml.safe_load(f)["saccade_profiles"]
+	return dict((str(name), make_saccade_msg(profile))
+		for (name, profile) in profiles.items())
+
 # ROS interfaces for the Atomese (OpenCog) Behavior Tree. Publishes
 # ROS messages for animation control (smiling, frowning), and subscribes
 # to STT/TTS and chatbot messages.
@@ -97,8 +149,8 @@ class EvaControl():
 	def expression(self, name, intensity, duration):
 		if 'noop' == name or (not self.control_mode & self.C_EXPRESSION):
 			return
-		# Create the message
-		exp = EmotionState()
+		# Fill in a message
+		exp = self.expression_msgs.get()
 		exp.name = name
 		exp.magnitude = intensity
 		exp.duration.secs = int(duration)
@@ -110,8 +162,8 @@ class EvaControl():
 	def soma_state(self, name, intensity, rate, ease_in=0.0):
 		if 'noop' == name or (not self.control_mode & self.C_SOMA):
 			return
-		# Create the message
-		soma = SomaState()
+		# Fill in a message
+		soma = self.soma_msgs.get()
 		soma.name = name
 		soma.magnitude = intensity
 		soma.rate = rate
@@ -124,8 +176,8 @@ class EvaControl():
 	def gesture(self, name, intensity, repeat, speed):
 		if 'noop' == name or (not self.control_mode & self.C_GESTURE):
 			return
-		# Create the message
-		ges = SetGesture()
+		# Fill in a message
+		ges = self.gesture_msgs.get()
 		ges.name = name
 		ges.magnitude = intensity
 		ges.repeat = repeat
@@ -162,7 +214,7 @@ class EvaControl():
 	def gaze_at_point(self, x, y, z):
 		xyz1 = numpy.array([x,y,z,1.0])
 		xyz = numpy.dot(self.conv_mat, xyz1)
-		trg = Target()
+		trg = self.gaze_msgs.get()
 		trg.x = xyz[0]
 		trg.y = xyz[1]
 		trg.z = xyz[2]
@@ -174,7 +226,7 @@ class EvaControl():
 	def look_at_point(self, x, y, z):
 		xyz1 = numpy.array([x, y, z, 1.0])
 		xyz = numpy.dot(self.conv_mat, xyz1)
-		trg = Target()
+		trg = self.turn_msgs.get()
 		trg.x = xyz[0]
 		trg.y = xyz[1]
 		trg.z = xyz[2]
@@ -201,67 +253,36 @@ class EvaControl():
 	# ----------------------------------------------------------
 	# Wrapper for saccade generator.
 
-	# Explore-the-room saccade when not conversing.
-	# ??? Is this exploring the room, or someone's face? I'm confused.
-	def explore_saccade(self):
+	# The parameter sets are in saccade-profiles.yaml; the messages are
+	# built when that is loaded, in __init__, and on reload.  The
+	# standard profiles are "explore" (explore-the-room saccade when
+	# not conversing), "conversational" (to study the face being
+	# looked at, during conversation) and "listening" (the same, while
+	# listening).
+	def saccade(self, profile):
 		if not self.control_mode & self.C_SACCADE:
 			return
-		# Switch to conversational (micro) saccade parameters
-		msg = SaccadeCycle()
-		msg.mean =  0.8        # saccade_explore_interval_mean
-		msg.variation = 0.3    # saccade_explore_interval_var
-		msg.paint_scale = 0.3   # saccade_explore_paint_scale
-		# From study face, maybe better default should be defined for
-		# explore
-		msg.eye_size = 15      # saccade_study_face_eye_size
-		msg.eye_distance = 100  # saccade_study_face_eye_distance
-		msg.mouth_width = 90    # saccade_study_face_mouth_width
-		msg.mouth_height = 27  # saccade_study_face_mouth_height
-		msg.weight_eyes = 0.8    # saccade_study_face_weight_eyes
-		msg.weight_mouth = 0.2   # saccade_study_face_weight_mouth
-		self.saccade_pub.publish(msg)
-
-	# Used during conversation to study face being looked at.
-	def conversational_saccade(self):
-		if not self.control_mode & self.C_SACCADE:
+		msg = self.saccade_msgs.get(profile)
+		if msg is None:
+			rospy.logwarn("Unknown saccade profile: " + profile)
 			return
-		# Switch to conversational (micro) saccade parameters
-		msg = SaccadeCycle()
-		msg.mean =  0.8         # saccade_micro_interval_mean
-		msg.variation = 0.5     # saccade_micro_interval_var
-		msg.paint_scale = 0.3   # saccade_micro_paint_scale
-		#
-		msg.eye_size = 11.5      # saccade_study_face_eye_size
-		msg.eye_distance = 100 # saccade_study_face_eye_distance
-		msg.mouth_width = 90    # saccade_study_face_mouth_width
-		msg.mouth_height = 5  # saccade_study_face_mouth_height
-		msg.weight_eyes = 0.8    # saccade_study_face_weight_eyes
-		msg.weight_mouth = 0.2   # saccade_study_face_weight_mouth
 		self.saccade_pub.publish(msg)
 
-	# Used during conversation to study face being looked at.
-	def listening_saccade(self):
-		if not self.control_mode & self.C_SACCADE:
+	# Re-read the saccade profiles. The new messages replace the old
+	# ones all at once; if the new profiles are bad, the old ones stay.
+	def reload_saccade_profiles_cb(self, data):
+		try:
+			self.saccade_msgs = load_saccade_msgs()
+		except Exception as ex:
+			rospy.logerr("Can't reload saccade profiles: " + str(ex))
 			return
-		# Switch to conversational (micro) saccade parameters
-		msg = SaccadeCycle()
-		msg.mean =  1         # saccade_micro_interval_mean
-		msg.variation = 0.6      # saccade_micro_interval_var
-		msg.paint_scale = 0.3      # saccade_micro_paint_scale
-		#
-		msg.eye_size = 11        # saccade_study_face_eye_size
-		msg.eye_distance = 80    # saccade_study_face_eye_distance
-		msg.mouth_width = 50     # saccade_study_face_mouth_width
-		msg.mouth_height = 13.0  # saccade_study_face_mouth_height
-		msg.weight_eyes = 0.8    # saccade_study_face_weight_eyes
-		msg.weight_mouth = 0.2   # saccade_study_face_weight_mouth
-		self.saccade_pub.publish(msg)
-
+		rospy.loginfo("Loaded saccade profiles: " +
+			", ".join(sorted(self.saccade_msgs.keys())))
 
 	# ----------------------------------------------------------
 	# Wrapper for controlling the blink rate.
 	def blink_rate(self, mean, variation):
-		msg = BlinkCycle()
+		msg = self.blink_msgs.get()
 		msg.mean = mean
 		msg.variation = variation
 		self.blink_pub.publish(msg)
@@ -378,6 +399,13 @@ class EvaControl():
 		self.saccade_pub = rospy.Publisher("/blender_api/set_saccade",
 		                                   SaccadeCycle, queue_size=1)
 
+		# Messages for the above, made once, and re-used.
+		self.expression_msgs = MessagePool(EmotionState)
+		self.gesture_msgs = MessagePool(SetGesture)
+		self.soma_msgs = MessagePool(SomaState)
+		self.blink_msgs = MessagePool(BlinkCycle)
+		self.saccade_msgs = load_saccade_msgs()
+
 		# ----------------
 		# XYZ coordinates of where to turn and look.
 		self.turn_pub = rospy.Publisher("/blender_api/set_face_target",
@@ -386,6 +414,9 @@ class EvaControl():
 		self.gaze_pub = rospy.Publisher("/blender_api/set_gaze_target",
 			Target, queue_size=1)
 
+		self.turn_msgs = MessagePool(Target)
+		self.gaze_msgs = MessagePool(Target)
+
 		# Int32 faceid of the face to glence at or turn and face.
 		self.glance_at_pub = rospy.Publisher("/opencog/glance_at",
 			Int32, queue_size=1)
@@ -438,4 +469,8 @@ class EvaControl():
 		rospy.Subscriber("/behavior_control", Int32, \
 			self.behavior_control_callback)
 
+		# Re-read the saccade profiles, after they've been edited.
+		rospy.Subscriber("/opencog/reload_saccade_profiles", String, \
+			self.reload_saccade_profiles_cb)
+
 # ----------------------------------------------------------------
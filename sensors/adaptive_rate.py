@@ -0,0 +1,122 @@
+#
+# adaptive_rate.py - Slow down the sensor traffic when the cogserver does.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import time
+from metrics import METRICS
+from smoothing import RateCap
+
+# Backpressure for the high-rate sensor channels.
+#
+# When the cogserver is busy (e.g. running lots of psi rules), feeding
+# it face positions, sound and saliency at the full sensor rate only
+# makes it fall further behind.  This measures how long the cogserver
+# takes to answer (by calling `ping` once every `interval` seconds;
+# normally AtomicMsgs.ping, which pings on a connection of its own, so
+# that the prober never stalls the senders while it waits for an answer)
+# and scales the forwarding rate of every channel by a common factor,
+# between `min_scale` and 1:
+#
+#  * if the (smoothed) round trip is over `high` seconds, or there was
+#    no answer at all, the scale is multiplied by `decrease`;
+#  * if it is under `low` seconds, `increase` is added back to it.
+#
+# (Multiplicative decrease, additive increase, as in TCP.) At full
+# scale, nothing is held back. Otherwise, channel `name` is let through
+# at most `rates[name] * scale` times per second, separately for each
+# key (so, for each face).
+#
+# The scale, the smoothed latency and the current rate of each channel
+# are published as metrics (see metrics.py).
+#
+class AdaptiveRate:
+
+	def __init__(self, ping, rates, low=0.02, high=0.1, decrease=0.5,
+	             increase=0.1, min_scale=0.05, interval=1.0, alpha=0.5):
+		self.ping = ping
+		self.rates = dict(rates)
+		self.low = low
+		self.high = high
+		self.decrease = decrease
+		self.increase = increase
+		self.min_scale = min_scale
+		self.interval = interval
+		self.alpha = alpha
+
+		self.scale = 1.0
+		self.latency = None
+		self.caps = {}
+		self.lock = threading.Lock()
+
+		METRICS.gauge("bridge_rate_scale", lambda: self.scale)
+		METRICS.gauge("cogserver_latency_smoothed_seconds",
+			lambda: self.latency)
+		for name in self.rates:
+			METRICS.gauge("bridge_channel_max_rate",
+				lambda name=name: self.rate(name), channel=name)
+
+		self.running = True
+		self.prober = threading.Thread(target=self.probe)
+		self.prober.daemon = True
+		self.prober.start()
+
+	def probe(self):
+		while self.running:
+			self.update(self.ping())
+			time.sleep(self.interval)
+
+	# Adjust the scale, given one measured round trip, in seconds, or
+	# None if the cogserver did not answer.
+	def update(self, rtt):
+		with self.lock:
+			if rtt is None:
+				overloaded = True
+			else:
+				if self.latency is None:
+					self.latency = rtt
+				else:
+					self.latency += self.alpha * (rtt - self.latency)
+				overloaded = self.high < self.latency
+
+			if overloaded:
+				self.scale = max(self.min_scale, self.scale * self.decrease)
+			elif self.latency < self.low:
+				self.scale = min(1.0, self.scale + self.increase)
+
+	# The current maximum rate of a channel, per second.
+	def rate(self, name):
+		return self.rates[name] * self.scale
+
+	# Return True if an update on this channel (and key) may be sent
+	# now. Channels without a configured rate are never held back.
+	def allow(self, name, key=None, now=None):
+		if self.scale >= 1.0 or name not in self.rates:
+			return True
+		with self.lock:
+			cap = self.caps.get((name, key))
+			if cap is None:
+				cap = self.caps[(name, key)] = RateCap()
+			cap.interval = 1.0 / self.rate(name)
+			if cap.ready(now):
+				return True
+		METRICS.counter("bridge_throttled_total", channel=name).inc()
+		return False
+
+	def close(self):
+		self.running = False
@@ -20,6 +20,7 @@
 import rospy
 from std_msgs.msg import String
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 
 '''
     This implements a ROS node that subscribes to the
@@ -30,9 +31,11 @@ from atomic_msgs import AtomicMsgs
 '''
 
 class Affect:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("chatbot_affect_perceive", String,
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe("chatbot_affect_perceive", String,
 			self.language_affect_perceive_cb)
 
 	# The perceived emotional content of words spoken to the robot.
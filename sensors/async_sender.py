@@ -0,0 +1,149 @@
+#
+# async_sender.py - Send scheme snippets from a background thread.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import traceback
+from coalesce import CoalescingQueue, PRIO_EVENT
+from metrics import METRICS
+
+# What to do when the queue is full.
+DROP_OLDEST = "drop-oldest"   # Make room by discarding the oldest snippet.
+DROP_NEWEST = "drop-newest"   # Discard the snippet being sent.
+BLOCK = "block"               # Wait until the writer makes room.
+
+# A transport that never blocks the caller (unless asked to).
+#
+# The rospy subscriber callbacks used to write to the cogserver
+# directly, and so were stuck until the cogserver had read the
+# snippet. One slow cogserver then stalled every topic.  Here, `send()`
+# just puts the snippet on a bounded queue, and returns; a background
+# writer thread takes snippets off the queue, and hands them to the
+# real transport.
+#
+# Keyed snippets are coalesced while queued, exactly as in the Batcher
+# (see coalesce.py), so a replacement never counts against the bound.
+#
+class AsyncSender:
+
+	def __init__(self, transport, max_queue=256, overflow=DROP_OLDEST):
+		if overflow not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+			raise ValueError("Unknown overflow policy: " + str(overflow))
+
+		self.transport = transport
+		self.max_queue = max_queue
+		self.overflow = overflow
+
+		self.queue = CoalescingQueue()
+		self.cond = threading.Condition()
+
+		# Set while the writer is handing a snippet to the transport.
+		# The writer pauses while anyone is waiting to revise the queue.
+		self.sending = False
+		self.revising = 0
+
+		# Snippets discarded because the queue was full.
+		self.overflowed = 0
+
+		METRICS.gauge("bridge_send_queue_depth", self.depth)
+		METRICS.gauge("bridge_send_overflowed_total", lambda: self.overflowed)
+		METRICS.gauge("bridge_send_coalesced_total",
+			lambda: self.queue.dropped)
+		self.errors = METRICS.counter("bridge_send_errors_total")
+
+		self.running = True
+		self.writer = threading.Thread(target=self.write_loop)
+		self.writer.daemon = True
+		self.writer.start()
+
+	# Queue a snippet. Returns zero if it was queued, and non-zero
+	# if it was thrown away.
+	#
+	# When the queue is full, a less urgent snippet is always thrown
+	# out to make room for a more urgent one (see coalesce.py); the
+	# overflow policy only decides between snippets of equal priority.
+	def send(self, content, key=None, priority=PRIO_EVENT):
+		with self.cond:
+			if key is None or key not in self.queue:
+				while self.max_queue <= len(self.queue):
+					lowest = self.queue.least_urgent()
+					if priority < lowest or (priority == lowest and
+					   self.overflow == DROP_OLDEST):
+						self.queue.pop(least_urgent=True)
+						self.overflowed += 1
+					elif self.overflow == BLOCK:
+						self.cond.wait()
+					else:
+						self.overflowed += 1
+						return 1
+
+			self.queue.put(content, key, priority)
+			self.cond.notify_all()
+		return 0
+
+	# Change the snippets still queued; see coalesce.py.  A snippet that
+	# the writer has already taken off the queue is waited for, so that
+	# once this returns, it is in the transport below, where it can be
+	# revised in turn.
+	def revise(self, edits):
+		with self.cond:
+			self.revising += 1
+			try:
+				while self.sending:
+					self.cond.wait()
+				self.queue.revise(edits)
+			finally:
+				self.revising -= 1
+				self.cond.notify_all()
+
+	def depth(self):
+		with self.cond:
+			return len(self.queue)
+
+	def write_loop(self):
+		while True:
+			with self.cond:
+				while self.revising or \
+				      (self.running and 0 == len(self.queue)):
+					self.cond.wait()
+				if 0 == len(self.queue):
+					return
+				key, content, priority = self.queue.pop()
+				self.sending = True
+
+				# Wake up anyone blocked on a full queue.
+				self.cond.notify_all()
+
+			# A snippet that cannot be sent (say, one that cannot be
+			# encoded) is lost, but must not take the writer with it.
+			try:
+				self.transport.send(content, key, priority)
+			except Exception:
+				self.errors.inc()
+				traceback.print_exc()
+
+			with self.cond:
+				self.sending = False
+				self.cond.notify_all()
+
+	# Stop the writer, once it has sent whatever is still queued.
+	def close(self):
+		with self.cond:
+			self.running = False
+			self.cond.notify_all()
+		self.writer.join()
@@ -19,27 +19,280 @@
 # Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
-from netcat import netcat
+from netcat import CogServerPool
+from batcher import Batcher
+from async_sender import AsyncSender, DROP_OLDEST
+from coalesce import PRIO_CONTROL, PRIO_EVENT, PRIO_TELEMETRY
+from scm_format import format_number, escape_string, balanced
+import compact_wire
+from compact_wire import CH_FACE_OCTOMAP, CH_SOUND, CH_DECIBEL, CH_BANG, \
+	CH_SALIENCY, CH_LUMINANCE, CH_DECIBEL_MEAN, CH_LUMINANCE_TREND
+
+# The Atomese sent to the cogserver, as %-format strings. Numbers go
+# in through format_number(), and the text of scheme strings through
+# escape_string(); see scm_format.py.
+FT_STATE = '(StateLink face-tracking-state face-tracking-%s)\n'
+
+VISIBLE_FACE = '(EvaluationLink (PredicateNode "visible face") ' \
+	'(ListLink (NumberNode "%s")))\n'
+
+TRACKED_FACE = '(StateLink request-eye-contact-state (NumberNode "%s"))\n'
+
+# The first statement deletes the association between the recognized
+# and tracked face; the rest delete the face itself. See delete_face().
+# XXX FIXME -- need to also delete the ListLink in the name pattern.
+DELETE_FACE = '(cog-execute! (PutLink (DeleteLink ' \
+	'(EvaluationLink (Predicate "name") ' \
+	'(ListLink (ConceptNode "%(faceid)s") (VariableNode "reco-id")))) ' \
+	'(GetLink ' \
+	'(EvaluationLink (Predicate "name") ' \
+	'(ListLink (ConceptNode "%(faceid)s") (VariableNode "reco-id"))))))\n' \
+	'(cog-delete ' \
+	'  (EvaluationLink (PredicateNode "visible face") ' \
+	'    (ListLink (NumberNode "%(faceid)s"))))\n' \
+	'(cog-delete ' \
+	'  (ListLink (NumberNode "%(faceid)s")))\n' \
+	'(cog-delete (NumberNode "%(faceid)s"))\n'
+
+# Delete many faces at once. A single pattern query finds the names of
+# all of them (one OrLink of EqualLinks, holding one FACE_ID_EQUAL for
+# each face), and the visible-face atoms go in one loop over the ids
+# (a FACE_ID_STRING each).
+DELETE_FACES = '(cog-execute! (PutLink ' \
+	'(VariableList (VariableNode "face-id") (VariableNode "reco-id")) ' \
+	'(DeleteLink ' \
+	'(EvaluationLink (Predicate "name") ' \
+	'(ListLink (VariableNode "face-id") (VariableNode "reco-id")))) ' \
+	'(GetLink ' \
+	'(VariableList (VariableNode "face-id") (VariableNode "reco-id")) ' \
+	'(AndLink ' \
+	'(EvaluationLink (Predicate "name") ' \
+	'(ListLink (VariableNode "face-id") (VariableNode "reco-id"))) ' \
+	'(OrLink %s)))))\n' \
+	'(for-each (lambda (id) ' \
+	'(cog-delete ' \
+	'  (EvaluationLink (PredicateNode "visible face") ' \
+	'    (ListLink (NumberNode id)))) ' \
+	'(cog-delete (ListLink (NumberNode id))) ' \
+	'(cog-delete (NumberNode id))) ' \
+	'(list %s))\n'
+
+FACE_ID_EQUAL = '(EqualLink (VariableNode "face-id") (ConceptNode "%s")) '
+
+FACE_ID_STRING = '"%s" '
+
+FACE_OCTOMAP = '(map-ato "faces" (NumberNode "%s" (av 5 0 0)) %s %s %s)\n'
+
+# All of the faces in one camera frame.
+FACE_FRAME = '(begin\n%s)\n'
+
+RECOGNIZED_FACE = '(make-recognized-face %s "%s")\n'
+
+WHO_SAID = '(who-said? "%s")\n'
+
+HEARD_TEXT = '(cog-evaluate! (PutLink (DefinedPredicate "heard text")' \
+	' (SentenceNode "%s")))\n'
+
+SOUND = '(map-sound %s %s %s)\n'
+
+DECIBEL = '(StateLink (AnchorNode "Decibel value") (NumberNode %s))\n'
+
+BANG = '(StateLink (AnchorNode "Sudden sound change value")' \
+	' (NumberNode %s))\n'
+
+SALIENCY = '(StateLink (AnchorNode "Salient location")' \
+	'(List (NumberNode %s)' \
+	'  (NumberNode %s)' \
+	'  (NumberNode %s)))\n' \
+	'(StateLink (AnchorNode "Salient degree")' \
+	'  (NumberNode %s))\n'
+
+LUMINANCE = '(StateLink (AnchorNode "luminance") (NumberNode %s))\n'
+
+# Summaries of the recent sensor history (see ring_buffer.py).
+DECIBEL_MEAN = '(StateLink (AnchorNode "Decibel mean") (NumberNode %s))\n'
+
+LUMINANCE_TREND = \
+	'(StateLink (AnchorNode "luminance trend") (NumberNode %s))\n'
+
+# The numeric sensor channels of the compact wire format, and the
+# Atomese that each one stands for (see compact_wire.py).
+TELEMETRY = {
+	CH_FACE_OCTOMAP : FACE_OCTOMAP,
+	CH_SOUND : SOUND,
+	CH_DECIBEL : DECIBEL,
+	CH_BANG : BANG,
+	CH_SALIENCY : SALIENCY,
+	CH_LUMINANCE : LUMINANCE,
+	CH_DECIBEL_MEAN : DECIBEL_MEAN,
+	CH_LUMINANCE_TREND : LUMINANCE_TREND,
+}
+
+# The channels whose rate the governor may turn down, by the names
+# used in adaptive_rate.py and its ROS params.
+GOVERNED = {
+	CH_FACE_OCTOMAP : "octomap",
+	CH_SOUND : "sound",
+	CH_SALIENCY : "saliency",
+}
+
+# The Atomese for a telemetry value. The values are all numbers, in
+# the order of the holes in the format string.
+def telemetry_scm(channel, values):
+	return TELEMETRY[channel] % tuple([format_number(v) for v in values])
+
+# The coalescing key for a telemetry value; see coalesce.py.
+def telemetry_key(channel, values):
+	if channel == CH_FACE_OCTOMAP:
+		return ("faces", values[0])
+	return TELEMETRY_ANCHORS.get(channel)
+
+# A bang is not listed: it is a pulse, one frame long, not a state,
+# and a bang followed by a 0.0 in the same tick must not be coalesced
+# into just the 0.0. Bangs are rare, and are never dropped.
+TELEMETRY_ANCHORS = {
+	CH_DECIBEL : "Decibel value",
+	CH_SALIENCY : "Salient location",
+	CH_LUMINANCE : "luminance",
+	CH_DECIBEL_MEAN : "Decibel mean",
+	CH_LUMINANCE_TREND : "luminance trend",
+}
+
+# Edits for queued face positions; see AtomicMsgs.forget_faces().
+def drop_snippet(content):
+	return None
+
+# A queued frame (FACE_FRAME), without the given faces; None if there
+# are none left.
+def strip_frame_scm(frame, faceids):
+	prefixes = tuple([FACE_OCTOMAP.split("%s")[0] + format_number(faceid)
+		+ '"' for faceid in faceids])
+	updates = [line for line in frame.splitlines(True)[1:-1]
+		if not line.startswith(prefixes)]
+	if not updates:
+		return None
+	return FACE_FRAME % "".join(updates)
+
+# The same, for a frame sent as compact records.
+def strip_frame_records(frame, faceids):
+	ids = set(faceids)
+	records = [compact_wire.encode_record(channel, values, stamp)
+		for (channel, stamp, values) in
+			compact_wire.RecordDecoder().feed(frame)
+		if int(values[0]) not in ids]
+	if not records:
+		return None
+	return "".join(records)
 
 # The code here is a quick, cheap hack to place information into the
 # cogserver atomspace. It opens a socket to the cogserver, and sends
 # scheme snippets across.  These areu usually some Atomese.
 #
+# The snippets go out over a `transport`, which is anything with a
+# `send(content)` method. By default, this is a pool of persistent
+# connections to the cogserver (see netcat.py).
+#
+# If `batch_interval` is given (in seconds), the snippets are not sent
+# right away; they are collected, and written out together once per
+# interval, or as soon as `batch_size` of them have piled up.
+#
+# Snippets that just set the latest value of some state (decibels,
+# luminance, face position) are sent with a key naming that state.
+# While queued, a newer value replaces an older one with the same key,
+# so that a busy cogserver never has to wade through stale samples.
+#
+# If `queue_size` is given, sending is asynchronous: the methods below
+# only queue the snippet, and return immediately; a background thread
+# does the actual writing. The `overflow` policy says what to do when
+# the queue is full (see async_sender.py).
+#
+# If `compact` is set, the numeric sensor data (face positions, sound,
+# audio, saliency, luminance) is sent as compact binary records, rather
+# than as scheme text, to a receiver that translates it back into the
+# same Atomese (see compact_wire.py and compact_receiver.py). All other
+# snippets are wrapped in text records. Text and records share a single
+# connection (`connections` is ignored), and the receiver forwards them
+# over a single connection of its own, so the cogserver evaluates them
+# in the order they were sent.  The receiver listens on `compact_port`.
+#
+# Every snippet has a priority (see coalesce.py): control (starting and
+# stopping the show, face-tracking on/off, psi settings) goes ahead of
+# events (speech, TTS, faces arriving and leaving), which go ahead of
+# telemetry (face positions, sound, audio, saliency, luminance), in
+# the batch and send queues.
+#
+# The `governor`, if set, is consulted before sending face positions,
+# sound locations and saliency, and may hold them back when the
+# cogserver is slow (see adaptive_rate.py).
+#
+# A single AtomicMsgs can (and should) be shared by all of the sensor
+# bridges, so that batching, coalescing and the connection pool apply
+# to all of the traffic, not just to that of one sensor. See main.py.
+#
 class AtomicMsgs:
 
-	def __init__(self):
-		self.hostname = "localhost"
-		self.port = 17020
+	def __init__(self, transport=None, batch_interval=None, batch_size=64,
+	             queue_size=None, overflow=DROP_OLDEST, compact=False,
+	             hostname="localhost", port=17020, compact_port=17021,
+	             connections=1):
+		self.hostname = hostname
+		self.port = port
+		self.compact_port = compact_port
+		self.compact = compact
+		if transport is None and compact:
+			transport = CogServerPool(self.hostname, self.compact_port,
+				1, shell=None, terminator=None)
+		elif transport is None:
+			transport = CogServerPool(self.hostname, self.port, connections)
+		if batch_interval:
+			transport = Batcher(transport, batch_interval, batch_size)
+		if queue_size:
+			transport = AsyncSender(transport, queue_size, overflow)
+		self.transport = transport
+		self.governor = None
+
+	def send(self, content, key=None, priority=PRIO_EVENT):
+		if not content.endswith("\n"):
+			content += "\n"
+		if self.compact:
+			content = compact_wire.encode_text(content)
+		return self.transport.send(content, key, priority)
+
+	# Send numeric sensor data, either as Atomese, or as a compact
+	# record, depending on how we were set up. Returns non-zero if the
+	# governor held it back.
+	def send_values(self, channel, *values):
+		key = telemetry_key(channel, values)
+		if self.governor and channel in GOVERNED and \
+		   not self.governor.allow(GOVERNED[channel], key):
+			return 1
+		if self.compact:
+			record = compact_wire.encode_record(channel, values)
+			return self.transport.send(record, key, PRIO_TELEMETRY)
+		return self.transport.send(telemetry_scm(channel, values), key,
+			PRIO_TELEMETRY)
+
+	# Round-trip time to the cogserver, in seconds, or None if it did
+	# not answer. The ping goes straight to the connection pool, past
+	# any batching or queueing, which would only add their own delay,
+	# and on a connection of its own, so that it never holds up a send.
+	def ping(self):
+		transport = self.transport
+		while not hasattr(transport, "ping"):
+			transport = getattr(transport, "transport", None)
+			if transport is None:
+				return None
+		return transport.ping()
 
 	# --------------------------------------------------------
 	# Wholeshow control -- Start and stop openpsi
 	def wholeshow_stop(self):
-		netcat(self.hostname, self.port, "(disable-all-demos)")
-		netcat(self.hostname, self.port, "(halt)")
+		self.send("(disable-all-demos)", None, PRIO_CONTROL)
+		self.send("(halt)", None, PRIO_CONTROL)
 
 	def wholeshow_start(self):
-		netcat(self.hostname, self.port, "(enable-all-demos)")
-		netcat(self.hostname, self.port, '(run)')
+		self.send("(enable-all-demos)", None, PRIO_CONTROL)
+		self.send('(run)', None, PRIO_CONTROL)
 
 	# --------------------------------------------------------
 	# Set the facetracking state in atomspace
@@ -48,17 +301,14 @@ class AtomicMsgs:
 			state = 'on'
 		else:
 			state = 'off'
-		face = '(StateLink face-tracking-state face-tracking-%s)\n' % state
-		netcat(self.hostname, self.port, face)
+		self.send(FT_STATE % state, None, PRIO_CONTROL)
 
 	# --------------------------------------------------------
 	# Face-tracking stuff
 
 	# Add a newly visible face to the atomspace.
 	def add_face_to_atomspace(self, faceid):
-		face = "(EvaluationLink (PredicateNode \"visible face\") " + \
-		       "(ListLink (NumberNode \"" + str(faceid) + "\")))\n"
-		netcat(self.hostname, self.port, face)
+		self.send(VISIBLE_FACE % format_number(faceid))
 		print "New visible face in atomspace: ", faceid
 
 	# Focus attention on specific face.
@@ -66,9 +316,7 @@ class AtomicMsgs:
 	# This bypasses the normal "new face is visible" sequence, and
 	# immediately shifts Eva's attention to this face.
 	def add_tracked_face_to_atomspace(self, faceid):
-		face = '(StateLink request-eye-contact-state (NumberNode "' + \
-		       str(faceid) + '"))\n'
-		netcat(self.hostname, self.port, face)
+		self.send(TRACKED_FACE % format_number(faceid))
 		print "Force focus of attention on face: ", faceid
 
 	# Remove a face (make it no longer visible).
@@ -76,38 +324,74 @@ class AtomicMsgs:
 
 		# AtomSpace cog-delete takes handle as an argument.
 		msg = self.delete_face(faceid)
-		netcat(self.hostname, self.port, msg)
+		self.forget_faces([faceid])
+		self.send(msg)
 		print "Removed face from atomspace: ", faceid
 
+	# Remove several faces, with a single send, and a single pattern
+	# query, no matter how many faces there are.
+	def remove_faces_from_atomspace(self, faceids):
+		if not faceids:
+			return 0
+		self.forget_faces(faceids)
+		self.send(self.delete_faces(faceids))
+		print "Removed faces from atomspace: ", faceids
+
+	# Take the faces out of the positions that are still queued, in
+	# every batch and send queue. The delete goes out in the event lane,
+	# ahead of the telemetry; a position queued before it would be sent
+	# after it, and would put the face right back into the atomspace.
+	def forget_faces(self, faceids):
+		edits = dict((("faces", faceid), drop_snippet) for faceid in faceids)
+		if self.compact:
+			strip = strip_frame_records
+		else:
+			strip = strip_frame_scm
+		edits[("faces", "frame")] = lambda frame: strip(frame, faceids)
+
+		transport = self.transport
+		while transport is not None:
+			if hasattr(transport, "revise"):
+				transport.revise(edits)
+			transport = getattr(transport, "transport", None)
+
 	# Build string to delete the face, and also to garbage-collect
 	# the ListLink and NumberNode.  In the long run, explicit deletes
 	# should not be needed, because the attention-allocation code
 	# should do this.  However, attention-alloc does not yet work.
 	def delete_face(self, faceid):
+		return DELETE_FACE % {"faceid": format_number(faceid)}
 
-		# Delete the association between the recognized and tracked face.
-		pattern = "(EvaluationLink (Predicate \"name\") " + \
-			"(ListLink (ConceptNode \"" + str(faceid) + "\") " + \
-			"(VariableNode \"reco-id\")))"
-
-		# XXX FIXME -- need to also delete the ListLink above.
-		del_reco = "(cog-execute! (PutLink (DeleteLink " + pattern + \
-				") (GetLink " + pattern + ")))\n"
-		face = del_reco + \
-				"(cog-delete " + \
-				"  (EvaluationLink (PredicateNode \"visible face\") " + \
-				"    (ListLink (NumberNode \"" + str(faceid) + "\"))))\n" + \
-				"(cog-delete " + \
-				"  (ListLink (NumberNode \"" + str(faceid) + "\")))\n" + \
-				"(cog-delete (NumberNode \"" + str(faceid) + "\"))\n"
-		return face
+	# The same, for a list of faces, as one snippet.
+	def delete_faces(self, faceids):
+		ids = [format_number(faceid) for faceid in faceids]
+		return DELETE_FACES % (
+			"".join([FACE_ID_EQUAL % faceid for faceid in ids]),
+			"".join([FACE_ID_STRING % faceid for faceid in ids]))
 
 	# Face postions in the space-server
 	def update_face_octomap(self, faceid, xx, yy, zz):
-		face = "(map-ato \"faces\" (NumberNode \"" + str(faceid) + \
-		        "\" (av 5 0 0)) " + str(xx) + " " + str(yy) + \
-		        " " + str(zz) + ")\n"
-		netcat(self.hostname, self.port, face)
+		self.send_values(CH_FACE_OCTOMAP, faceid, xx, yy, zz)
+
+	# Positions of all the faces seen in one camera frame, given as a
+	# list of (faceid, x, y, z) tuples. These all go out together, as a
+	# single snippet (or a single write of compact records), no matter
+	# how many faces there are.  A newer frame replaces an older one
+	# that is still waiting to be sent.
+	def update_face_octomaps(self, faces):
+		if not faces:
+			return 0
+		if self.governor and \
+		   not self.governor.allow("octomap", ("faces", "frame")):
+			return 1
+		if self.compact:
+			content = "".join([compact_wire.encode_record(CH_FACE_OCTOMAP, f)
+				for f in faces])
+		else:
+			content = FACE_FRAME % "".join([
+				telemetry_scm(CH_FACE_OCTOMAP, f) for f in faces])
+		return self.transport.send(content, ("faces", "frame"),
+			PRIO_TELEMETRY)
 
 	# --------------------------------------------------------
 
@@ -122,77 +406,78 @@ class AtomicMsgs:
 		`rec_id` is "0" for an unrecognized face and some other string
 		for a recognized face. It is currently stored as a ConceptNode.
 		'''
-		fc = '(make-recognized-face ' + str(tracker_id) + ' "' + name + '")\n'
-		netcat(self.hostname, self.port, fc)
+		self.send(RECOGNIZED_FACE %
+			(format_number(tracker_id), escape_string(name)))
 
 	# --------------------------------------------------------
 	# Speech-to-text stuff
 	def who_said(self, stt):
-		spoke = "(who-said? \"" + stt + "\")\n"
-		netcat(self.hostname, self.port, spoke)
+		self.send(WHO_SAID % escape_string(stt))
 
 	# Pass the text that STT heard into opencog.
 	# Rather than setting state, we're going to trigger a script, here.
 	def perceived_text(self, text):
-		netcat(self.hostname, self.port,
-			'(cog-evaluate! (PutLink (DefinedPredicate "heard text")' +
-			' (SentenceNode "' + text + '")))')
+		self.send(HEARD_TEXT % escape_string(text))
 
 	# Affect in speech
 	# Indicate that the robot heard freindly speech
 	def affect_happy(self):
-		netcat(self.hostname, self.port, "(State chat-affect chat-happy)")
+		self.send("(State chat-affect chat-happy)")
 
 	# Indicate that the robot heard negative speech
 	def affect_negative(self):
-		netcat(self.hostname, self.port, "(State chat-affect chat-negative)")
+		self.send("(State chat-affect chat-negative)")
 
 	# --------------------------------------------------------
 	# Text-to-speech stuff
 	# Let atomspace know that vocalization has started or ended.
 	def vocalization_started(self):
-		netcat(self.hostname, self.port, "(State chat-state chat-start)")
+		self.send("(State chat-state chat-start)")
 
 	def vocalization_ended(self):
-		netcat(self.hostname, self.port, "(State chat-state chat-stop)")
+		self.send("(State chat-state chat-stop)")
 
 	# --------------------------------------------------------
 	# Sound localization -- send 3D xyz coordinate of sound source
 	def update_sound(self, x, y, z):
-		snd = "(map-sound " + str(x) + " " + str(y) + " " + str(z) + ")\n"
-		netcat(self.hostname, self.port, snd)
+		self.send_values(CH_SOUND, x, y, z)
 
 	def audio_energy(self, decibel):
 		# A StateLink is used because evaluation of psi-rules should
 		# only depend on the most recent value.
-		deci = '(StateLink (AnchorNode "Decibel value") ' + \
-			' (NumberNode ' + str(decibel) + '))\n'
-		netcat(self.hostname, self.port, deci)
+		self.send_values(CH_DECIBEL, decibel)
 
 	# Louds bands, explosions, hand-claps, shouts.
 	def audio_bang(self, decibel):
-		loud = '(StateLink (AnchorNode "Sudden sound change value")' + \
-			' (NumberNode ' + str(decibel) + '))\n'
-		netcat(self.hostname, self.port, loud)
+		self.send_values(CH_BANG, decibel)
 
 	#saliency location
 	#Degree of the salient point
 	def saliency(self, x, y, z, deg):
-		sal = '(StateLink (AnchorNode "Salient location")' + \
-			'(List (NumberNode '+ str(x)+ ')' + \
-			'  (NumberNode '+ str(y) + ')' + \
-			'  (NumberNode '+ str(z) + ')))\n' + \
-			'(StateLink (AnchorNode "Salient degree")' + \
-			'  (NumberNode '+ str(deg) + '))\n'
-		netcat(self.hostname, self.port, sal)
+		self.send_values(CH_SALIENCY, x, y, z, deg)
 
 	#room luminance <=25 - dark, <=40 - normal, >40 - bright
 	def room_brightness(self, bright):
-		room = '(StateLink (AnchorNode "luminance")' +\
-			' (NumberNode ' + str(bright) +'))\n'
-		netcat(self.hostname, self.port, room)
+		self.send_values(CH_LUMINANCE, bright)
+
+	# Summaries, computed by the bridge from the recent history.
+	# Average loudness, over the last few seconds.
+	def audio_energy_mean(self, decibel):
+		self.send_values(CH_DECIBEL_MEAN, decibel)
+
+	# Is the room getting brighter (positive) or darker (negative)?
+	# In luminance units per second.
+	def room_brightness_trend(self, slope):
+		self.send_values(CH_LUMINANCE_TREND, slope)
 
 	# --------------------------------------------------------
 	# Generic
+	# Used for the psi control settings; these go out as control.
+	# The text is sent as-is, so it is checked first: an unbalanced
+	# snippet would stall the cogserver shell for everything sent after
+	# it (see netcat.py). Returns non-zero if it was refused.
 	def evaluate_scm(self, scm_string):
-		netcat(self.hostname, self.port, scm_string)
+		if not balanced(scm_string):
+			print "Refusing unbalanced scheme: ", scm_string
+			return 1
+		return self.send(scm_string, None, PRIO_CONTROL)
@@ -17,8 +17,13 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
+import time
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe, get_param
+from deadband import Deadband
+from onset import OnsetDetector
+from ring_buffer import TimeSeries
+from smoothing import RateCap
 
 # XXX FIXME -- where the heck is audio_stream.msg defined ?????
 # Its defined somewhere deep in the bowels of HEAD.   Just copy
@@ -40,16 +45,51 @@ from hr_msgs.msg import audiodata
 '''
 
 class AudioPower:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("audio_sensors", audiodata, self.audio_cb)
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
 
+		# Most audio frames carry no news: no bang, and about the
+		# same loudness as the last one. Only pass on the changes.
+		self.deadband = Deadband()
+		self.deadband.configure("bang", **get_param("deadband/bang",
+			{"epsilon": 0.0}))
+		self.deadband.configure("decibel", **get_param("deadband/decibel",
+			{"epsilon": 1.0}))
+
+		# Recent loudness, and how often to send its average.
+		history = get_param("history/decibel", {})
+		self.history = TimeSeries(history.get("capacity", 1024),
+			history.get("window", 10.0))
+		self.summary_cap = RateCap(history.get("summary_rate", 1.0))
+
+		# Bangs are detected here, from the decibel stream (see onset.py).
+		# The upstream SuddenChange flag fires too often to be trusted on
+		# its own; it is only used if `onset/trust_upstream` is set.
+		onset_params = get_param("onset", {})
+		self.trust_upstream = onset_params.pop("trust_upstream", False)
+		self.onset = OnsetDetector(**onset_params)
+
+		subscribe("audio_sensors", audiodata, self.audio_cb)
+
+	# The bang value sent to the atomspace is the confidence that a
+	# sudden sound just happened; zero when nothing happened.
 	def audio_cb(self, data):
+		now = time.time()
 		#print "SuddenChange {}".format(data.SuddenChange)
-		if data.SuddenChange:
-			print "Heard a loud bang!"
-			self.atomo.audio_bang(1.0)
-		else:
-			self.atomo.audio_bang(0.0)
+		bang = self.onset.update(now, data.Decibel)
+		if self.trust_upstream and data.SuddenChange:
+			bang = 1.0
+		if 0.0 < bang:
+			print "Heard a loud bang! confidence=", bang
+
+		if self.deadband.allow("bang", bang):
+			self.atomo.audio_bang(bang)
+
+		if self.deadband.allow("decibel", data.Decibel):
+			self.atomo.audio_energy(data.Decibel)
 
-		self.atomo.audio_energy(data.Decibel)
+		self.history.push(now, data.Decibel)
+		if self.summary_cap.ready(now):
+			self.atomo.audio_energy_mean(self.history.mean())
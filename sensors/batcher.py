@@ -0,0 +1,110 @@
+#
+# batcher.py - Collect scheme snippets, and send them in batches.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import time
+import traceback
+from coalesce import CoalescingQueue, PRIO_CONTROL, PRIO_EVENT
+from metrics import METRICS
+
+# A transport that sits in front of another transport (usually a
+# CogServerPool), and collects snippets, instead of sending them right
+# away. Everything collected is written out in a single `send()` once
+# per tick, or sooner, if `max_size` snippets have piled up.
+#
+# With many sensors active, this turns dozens of small socket writes
+# (and dozens of cogserver reads and parses) per tick into just one.
+# The price is latency: a snippet may wait up to `interval` seconds
+# before it goes out.
+#
+# Snippets sent with a `key` are coalesced while they wait: if a newer
+# snippet with the same key arrives before the batch is flushed, the
+# older one is dropped. See coalesce.py.
+#
+class Batcher:
+
+	def __init__(self, transport, interval=0.05, max_size=64):
+		self.transport = transport
+		self.interval = interval
+		self.max_size = max_size
+
+		self.pending = CoalescingQueue()
+		self.lock = threading.Lock()
+
+		# Held while a batch is being written, so that a flush forced
+		# by a full queue, and a flush from the ticker, do not get
+		# interleaved, and the batches go out in order.
+		self.send_lock = threading.Lock()
+
+		METRICS.gauge("bridge_batch_queue_depth", lambda: len(self.pending))
+		METRICS.gauge("bridge_batch_coalesced_total",
+			lambda: self.pending.dropped)
+		self.errors = METRICS.counter("bridge_batch_flush_errors_total")
+
+		self.running = True
+		self.ticker = threading.Thread(target=self.tick)
+		self.ticker.daemon = True
+		self.ticker.start()
+
+	# Queue a snippet. Always succeeds; errors are reported by
+	# the underlying transport, when the batch is flushed.
+	# The snippets are pasted together as they are; each must already
+	# end with a newline (AtomicMsgs sees to that).
+	#
+	# Within a batch, the more urgent snippets come first. A control
+	# snippet does not wait for the tick; it is sent right away, along
+	# with whatever else is pending.
+	def send(self, content, key=None, priority=PRIO_EVENT):
+		with self.lock:
+			self.pending.put(content, key, priority)
+			full = self.max_size <= len(self.pending)
+
+		if full or priority == PRIO_CONTROL:
+			self.flush()
+		return 0
+
+	# Change the snippets waiting for the next batch; see coalesce.py.
+	def revise(self, edits):
+		with self.lock:
+			self.pending.revise(edits)
+
+	# Write out everything queued so far, as one send.
+	def flush(self):
+		with self.send_lock:
+			with self.lock:
+				priority = self.pending.most_urgent()
+				batch = self.pending.take_all()
+			if not batch:
+				return 0
+			return self.transport.send("".join(batch), None, priority)
+
+	# A batch that fails to go out is lost, but the ticker must keep
+	# going, or nothing would be sent until the queue fills up.
+	def tick(self):
+		while self.running:
+			time.sleep(self.interval)
+			try:
+				self.flush()
+			except Exception:
+				self.errors.inc()
+				traceback.print_exc()
+
+	def close(self):
+		self.running = False
+		self.flush()
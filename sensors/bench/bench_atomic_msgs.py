@@ -0,0 +1,201 @@
+#! /usr/bin/env python
+#
+# bench_atomic_msgs.py - Cost of generating and sending AtomicMsgs.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+# Benchmarks for the hot path of the sensor bridge.
+#
+# First, the cost of every AtomicMsgs method, with a transport that
+# throws the snippets away; this is the cost of building the Atomese.
+#
+# Second, the throughput and latency of the transports, sending face
+# positions to a FakeCogServer on a local port: a new netcat() per
+# snippet, a persistent connection, batching, batching with coalescing,
+# and all of that behind the asynchronous sender.  The positions cycle
+# through `--faces` face ids, so that coalescing has that many keys to
+# work with, as it would with a room full of people. The latency of a
+# snippet is from the call to AtomicMsgs until its arrival at the
+# fake cogserver. Coalesced snippets never arrive, and do not count;
+# so both the rate at which snippets were sent, and the rate at which
+# they were delivered, are reported.
+#
+#    ./bench_atomic_msgs.py [--count N] [--rate R] [--faces F]
+#
+import argparse
+import os
+import re
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from atomic_msgs import AtomicMsgs
+from async_sender import AsyncSender
+from batcher import Batcher
+from coalesce import PRIO_TELEMETRY
+from fake_cogserver import FakeCogServer
+from netcat import CogServerPool
+from bench_common import NullTransport, NetcatTransport
+
+# ------------------------------------------------------------------
+# Drops the coalescing keys, to measure batching on its own.
+class Unkeyed:
+	def __init__(self, transport):
+		self.transport = transport
+
+	def send(self, content, key=None, priority=None):
+		return self.transport.send(content, None, priority)
+
+# ------------------------------------------------------------------
+# Message generation.
+
+FACES = [(42, 1.2345678, -0.25, 0.0625), (43, 1.5, 0.125, -0.03125),
+	(44, 0.875, 0.5, 0.25)]
+
+METHODS = [
+	("wholeshow_stop", ()),
+	("wholeshow_start", ()),
+	("update_ft_state_to_atomspace", (True,)),
+	("add_face_to_atomspace", (42,)),
+	("add_tracked_face_to_atomspace", (42,)),
+	("remove_face_from_atomspace", (42,)),
+	("delete_face", (42,)),
+	("remove_faces_from_atomspace", ([42, 43, 44],)),
+	("delete_faces", ([42, 43, 44],)),
+	("update_face_octomap", FACES[0]),
+	("update_face_octomaps", (FACES,)),
+	("face_recognition", (42, "Alice")),
+	("who_said", ("Hello Sophia, how are you today?",)),
+	("perceived_text", ("Hello Sophia, how are you today?",)),
+	("affect_happy", ()),
+	("affect_negative", ()),
+	("vocalization_started", ()),
+	("vocalization_ended", ()),
+	("update_sound", (0.5, -1.25, 0.75)),
+	("audio_energy", (63.5,)),
+	("audio_bang", (0.87,)),
+	("saliency", (1.0, -0.3125, 0.71875, 0.5)),
+	("room_brightness", (117.0,)),
+	("audio_energy_mean", (58.25,)),
+	("room_brightness_trend", (-0.5,)),
+	("evaluate_scm", ("(cog-prt-atomspace)",)),
+]
+
+def bench_generation(count, compact):
+	atomo = AtomicMsgs(NullTransport(), compact=compact)
+
+	# Some of the face methods print; don't time the terminal.
+	devnull = open(os.devnull, "w")
+	print "usec/call" + (" (compact)" if compact else "")
+	for (name, args) in METHODS:
+		method = getattr(atomo, name)
+		timer = timeit.Timer(lambda: method(*args))
+		stdout = sys.stdout
+		sys.stdout = devnull
+		try:
+			best = min(timer.repeat(3, count))
+		finally:
+			sys.stdout = stdout
+		print "%-30s %10.3f" % (name, 1.0e6 * best / count)
+	print
+
+# ------------------------------------------------------------------
+# Transport throughput and latency.
+
+# The x coordinate carries the sequence number of the snippet.
+OCTOMAP = re.compile(r'\(map-ato "faces" \(NumberNode "\d+" \(av 5 0 0\)\) (\S+) ')
+DONE = "(bench-done)"
+
+def percentile(ordered, q):
+	if not ordered:
+		return float("nan")
+	return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Send `count` face positions through `atomo`, for `faces` different
+# faces in turn (at `rate` per second, or flat out if zero), then wait
+# for the server to get the last one.
+def bench_transport(server, atomo, count, rate, faces):
+	server.clear()
+	sent = [0.0] * count
+	start = time.time()
+	for i in range(count):
+		if 0 < rate:
+			delay = start + i / rate - time.time()
+			if 0 < delay:
+				time.sleep(delay)
+		sent[i] = time.time()
+		atomo.update_face_octomap(i % faces, float(i), 0.5, 0.25)
+	# Sent in the telemetry lane, so that it does not overtake.
+	atomo.send(DONE, None, PRIO_TELEMETRY)
+
+	while DONE not in server.lines:
+		server.wait_for(len(server.received) + 1, 1.0)
+	elapsed = time.time() - start
+
+	latency = []
+	for (when, line) in server.received:
+		m = OCTOMAP.search(line)
+		if m:
+			latency.append(when - sent[int(float(m.group(1)))])
+	latency.sort()
+	return (len(latency), count / elapsed, len(latency) / elapsed,
+		percentile(latency, 0.5), percentile(latency, 0.99))
+
+def transports(server):
+	host = server.hostname
+	port = server.port
+	yield ("netcat", NetcatTransport(host, port))
+	yield ("connection", CogServerPool(host, port, 1))
+	yield ("batched", Unkeyed(Batcher(CogServerPool(host, port, 1), 0.01)))
+	yield ("coalesced", Batcher(CogServerPool(host, port, 1), 0.01))
+	yield ("async+coalesced", AsyncSender(
+		Batcher(CogServerPool(host, port, 1), 0.01), 256))
+
+def close(transport):
+	while transport is not None:
+		if hasattr(transport, "close"):
+			transport.close()
+		transport = getattr(transport, "transport", None)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Benchmark AtomicMsgs generation and transports.")
+	parser.add_argument("--count", type=int, default=2000,
+		help="snippets per transport benchmark")
+	parser.add_argument("--rate", type=float, default=0.0,
+		help="snippets per second; zero is as fast as possible")
+	parser.add_argument("--faces", type=int, default=50,
+		help="face ids to cycle through, in the transport benchmark")
+	parser.add_argument("--iterations", type=int, default=20000,
+		help="calls per generation benchmark")
+	args = parser.parse_args()
+
+	bench_generation(args.iterations, False)
+	bench_generation(args.iterations, True)
+
+	server = FakeCogServer().start()
+	print "%-18s %7s %9s %10s %10s %10s %10s" % ("transport", "sent",
+		"delivered", "sent/sec", "dlvrd/sec", "p50 msec", "p99 msec")
+	for (name, transport) in transports(server):
+		delivered, sent_rate, dlvr_rate, p50, p99 = bench_transport(server,
+			AtomicMsgs(transport), args.count, args.rate, args.faces)
+		close(transport)
+		print "%-18s %7d %9d %10.1f %10.1f %10.3f %10.3f" % (name,
+			args.count, delivered, sent_rate, dlvr_rate,
+			1000.0 * p50, 1000.0 * p99)
+	server.stop()
@@ -0,0 +1,37 @@
+#
+# bench_common.py - Transports shared by the benchmarks.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from netcat import netcat
+
+# Transports used only for benchmarking. The benchmarks put the parent
+# directory on the path before importing this.
+
+# Throws everything away.
+class NullTransport:
+	def send(self, content, key=None, priority=None):
+		return 0
+
+# The original: a brand new connection for every snippet.
+class NetcatTransport:
+	def __init__(self, hostname, port):
+		self.hostname = hostname
+		self.port = port
+
+	def send(self, content, key=None, priority=None):
+		return netcat(self.hostname, self.port, content)
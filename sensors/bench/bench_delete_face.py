@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+#
+# bench_delete_face.py - Deleting faces one at a time, or all at once.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+# Compare clearing N faces with a loop of remove_face_from_atomspace()
+# (one snippet, one send and one pattern query per face) against a
+# single remove_faces_from_atomspace() (one of each, in all). Both are
+# sent to a FakeCogServer, over a new netcat() connection per send (as
+# the bridge used to), and over a persistent connection.  Reported are
+# the sends, the pattern queries (cog-execute!), the bytes, and the
+# time until the cogserver has all of it.  The fake cogserver does not
+# run the queries; on a real one, each costs a pattern-matcher run.
+#
+#    ./bench_delete_face.py [repetitions]
+#
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from atomic_msgs import AtomicMsgs
+from fake_cogserver import FakeCogServer
+from netcat import CogServerPool
+from bench_common import NetcatTransport
+
+# Sent after each clear, so that we know when the cogserver has it all.
+# Like any snippet, it must be balanced, or the shell would wait for
+# the rest of it.
+DONE = "(bench-done)"
+
+# Counts what goes through it, on its way to the real transport.
+class Counter:
+	def __init__(self, transport):
+		self.transport = transport
+		self.sends = 0
+		self.bytes = 0
+		self.queries = 0
+
+	def send(self, content, key=None, priority=None):
+		self.sends += 1
+		self.bytes += len(content)
+		self.queries += content.count("(cog-execute!")
+		return self.transport.send(content, key, priority)
+
+def clear_loop(atomo, faceids):
+	for faceid in faceids:
+		atomo.remove_face_from_atomspace(faceid)
+
+def clear_batch(atomo, faceids):
+	atomo.remove_faces_from_atomspace(faceids)
+
+# Seconds until the server has seen the end of the last snippet.
+def run(server, transport, clear, faceids, reps):
+	counter = Counter(transport)
+	atomo = AtomicMsgs(counter)
+
+	devnull = open(os.devnull, "w")
+	stdout = sys.stdout
+	best = None
+	for rep in range(reps):
+		server.clear()
+		start = time.time()
+		sys.stdout = devnull
+		try:
+			clear(atomo, faceids)
+			atomo.send(DONE)
+		finally:
+			sys.stdout = stdout
+		while DONE not in server.lines:
+			server.wait_for(len(server.received) + 1, 1.0)
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	# Don't count the end marker.
+	return (counter.sends / reps - 1, counter.queries / reps,
+		counter.bytes / reps - len(DONE) - 1, best)
+
+if __name__ == "__main__":
+	reps = 20
+	if 1 < len(sys.argv):
+		reps = int(sys.argv[1])
+
+	server = FakeCogServer().start()
+	transports = [
+		("netcat", NetcatTransport(server.hostname, server.port)),
+		("connection", CogServerPool(server.hostname, server.port, 1)),
+	]
+
+	print "%-12s %6s %-6s %6s %8s %8s %10s" % ("transport", "faces", "how",
+		"sends", "queries", "bytes", "msec")
+	for (tname, transport) in transports:
+		for nfaces in (1, 5, 20, 50):
+			faceids = range(100, 100 + nfaces)
+			for (how, clear) in (("loop", clear_loop), ("batch", clear_batch)):
+				sends, queries, nbytes, best = run(server, transport, clear,
+					faceids, reps)
+				print "%-12s %6d %-6s %6d %8d %8d %10.3f" % (tname, nfaces,
+					how, sends, queries, nbytes, 1000.0 * best)
+	server.stop()
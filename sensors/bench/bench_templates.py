@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+#
+# bench_templates.py - Cost of building the Atomese snippets.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+# Micro-benchmark: compare the per-message cost of building the Atomese
+# the way atomic_msgs.py does now, against the string concatenation
+# that was used before. Nothing is sent anywhere.
+#
+# The old way is not doing the same work: it wrote floats with str(),
+# which rounds them to 12 digits, and pasted text in without escaping
+# it. The new way is slower, up to three or four times so, almost all
+# of it in format_number() and escape_string(); that is the price of
+# sending exactly the value that was measured, or heard. The speedup
+# column is old/new, so expect it to be below 1.0.
+#
+#    ./bench_templates.py [iterations]
+#
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import atomic_msgs
+from atomic_msgs import AtomicMsgs, telemetry_scm
+from compact_wire import CH_FACE_OCTOMAP, CH_SALIENCY, CH_DECIBEL
+from scm_format import escape_string
+
+# The old way of doing it; copied from atomic_msgs.py, as it was.
+def old_face_octomap(faceid, xx, yy, zz):
+	return "(map-ato \"faces\" (NumberNode \"" + str(faceid) + \
+	        "\" (av 5 0 0)) " + str(xx) + " " + str(yy) + \
+	        " " + str(zz) + ")\n"
+
+def old_saliency(x, y, z, deg):
+	return '(StateLink (AnchorNode "Salient location")' + \
+		'(List (NumberNode '+ str(x)+ ')' + \
+		'  (NumberNode '+ str(y) + ')' + \
+		'  (NumberNode '+ str(z) + ')))\n' + \
+		'(StateLink (AnchorNode "Salient degree")' + \
+		'  (NumberNode '+ str(deg) + '))\n'
+
+def old_delete_face(faceid):
+	pattern = "(EvaluationLink (Predicate \"name\") " + \
+		"(ListLink (ConceptNode \"" + str(faceid) + "\") " + \
+		"(VariableNode \"reco-id\")))"
+	del_reco = "(cog-execute! (PutLink (DeleteLink " + pattern + \
+			") (GetLink " + pattern + ")))\n"
+	return del_reco + \
+			"(cog-delete " + \
+			"  (EvaluationLink (PredicateNode \"visible face\") " + \
+			"    (ListLink (NumberNode \"" + str(faceid) + "\"))))\n" + \
+			"(cog-delete " + \
+			"  (ListLink (NumberNode \"" + str(faceid) + "\")))\n" + \
+			"(cog-delete (NumberNode \"" + str(faceid) + "\"))\n"
+
+def old_audio_energy(decibel):
+	return '(StateLink (AnchorNode "Decibel value") ' + \
+		' (NumberNode ' + str(decibel) + '))\n'
+
+def old_perceived_text(text):
+	return '(cog-evaluate! (PutLink (DefinedPredicate "heard text")' + \
+		' (SentenceNode "' + text + '")))'
+
+# The new way. AtomicMsgs.delete_face() only builds the snippet; it does
+# not send it, so the transport is never used.
+atomo = AtomicMsgs(transport=object())
+
+def new_face_octomap(faceid, xx, yy, zz):
+	return telemetry_scm(CH_FACE_OCTOMAP, (faceid, xx, yy, zz))
+
+def new_saliency(x, y, z, deg):
+	return telemetry_scm(CH_SALIENCY, (x, y, z, deg))
+
+def new_audio_energy(decibel):
+	return telemetry_scm(CH_DECIBEL, (decibel,))
+
+def new_perceived_text(text):
+	return atomic_msgs.HEARD_TEXT % escape_string(text)
+
+CASES = [
+	("update_face_octomap", old_face_octomap, new_face_octomap,
+		(42, 1.2345678, -0.25, 0.0625)),
+	("saliency", old_saliency, new_saliency,
+		(1.0, -0.3125, 0.71875, 0.5)),
+	("delete_face", old_delete_face, atomo.delete_face, (42,)),
+	("audio_energy", old_audio_energy, new_audio_energy, (63.5,)),
+	("perceived_text", old_perceived_text, new_perceived_text,
+		("Hello Sophia, how are you today?",)),
+]
+
+def usec_per_call(func, args, count):
+	timer = timeit.Timer(lambda: func(*args))
+	return 1.0e6 * min(timer.repeat(3, count)) / count
+
+if __name__ == "__main__":
+	count = 100000
+	if 1 < len(sys.argv):
+		count = int(sys.argv[1])
+
+	print "%-20s %12s %12s %8s" % ("usec/message", "concatenate", "format",
+		"speedup")
+	for (name, old, new, args) in CASES:
+		t_old = usec_per_call(old, args, count)
+		t_new = usec_per_call(new, args, count)
+		print "%-20s %12.3f %12.3f %8.2f" % (name, t_old, t_new, t_old / t_new)
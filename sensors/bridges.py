@@ -0,0 +1,93 @@
+#
+# bridges.py - Registry of the sensor bridges, loaded on demand.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import importlib
+import time
+import traceback
+import yaml
+
+# Every sensor bridge, by name, as the module and class that implement
+# it. A bridge module is imported only if that bridge is enabled, so
+# that the message packages of subsystems that are not deployed (e.g.
+# pi_face_tracker, face_id, ros_nmpt_saliency, room_luminance) need not
+# be installed. A bridge that fails to load is reported, and skipped;
+# the others still start.
+BRIDGES = [
+	("control", "control", "Control"),
+	("control_psi", "control_psi", "ControlPsi"),
+	("affect", "affect", "Affect"),
+	("audio_power", "audio_power", "AudioPower"),
+	("chat_track", "chat_track", "ChatTrack"),
+	("face_recog", "face_recog", "FaceRecog"),
+	("face_track", "face_track", "FaceTrack"),
+	("sound_track", "sound_track", "SoundTrack"),
+	("room_brightness", "room_brightness", "RoomBrightness"),
+	("saliency_track", "saliency_track", "SaliencyTrack"),
+	("tts_feedback", "tts_feedback", "TTSFeedback"),
+]
+
+BRIDGE_NAMES = [name for (name, module, cls) in BRIDGES]
+
+# The names of the bridges listed in a YAML file, of the form
+#
+#    bridges: [control, chat_track, tts_feedback]
+#
+def read_config(path):
+	with open(path) as f:
+		return yaml.safe_load(f)["bridges"]
+
+# Import and create the named bridges (all of them, if `names` is None),
+# all sharing `atomo`. Returns a dict of the bridges that started, by
+# name, and a report: a list of (name, import seconds, create seconds,
+# error message or None).
+def load_bridges(atomo, names=None):
+	if names is None:
+		names = BRIDGE_NAMES
+	unknown = set(names) - set(BRIDGE_NAMES)
+	if unknown:
+		raise ValueError("Unknown bridge(s) %s; expecting some of %s" %
+			(", ".join(sorted(unknown)), ", ".join(BRIDGE_NAMES)))
+
+	bridges = {}
+	report = []
+	for (name, module, cls) in BRIDGES:
+		if name not in names:
+			continue
+		start = time.time()
+		try:
+			factory = getattr(importlib.import_module(module), cls)
+		except ImportError as e:
+			report.append((name, time.time() - start, 0.0,
+				"not installed: " + str(e)))
+			continue
+		loaded = time.time()
+		try:
+			bridges[name] = factory(atomo)
+			error = None
+		except Exception as e:
+			traceback.print_exc()
+			error = "failed: " + str(e)
+		report.append((name, loaded - start, time.time() - loaded, error))
+	return (bridges, report)
+
+def print_report(report):
+	print "%-16s %10s %10s" % ("bridge", "import ms", "start ms")
+	for (name, t_import, t_create, error) in report:
+		print "%-16s %10.1f %10.1f %s" % (name, 1000.0 * t_import,
+			1000.0 * t_create, error or "ok")
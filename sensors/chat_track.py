@@ -17,11 +17,11 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
 
-import rospy
 # from chatbot.msg import ChatMessage
 # from msg import ChatMessage
 from hr_msgs.msg import ChatMessage
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 
 '''
 Subscribe to text ROS messages, typically from the speech-to-text
@@ -33,9 +33,11 @@ Unit test by saying
 
 class ChatTrack:
 
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("chatbot_speech", ChatMessage,
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe("chatbot_speech", ChatMessage,
 			self.chat_perceived_text_cb)
 
 	# ---------------------------------------------------------------
@@ -0,0 +1,139 @@
+#
+# coalesce.py - Queue of scheme snippets, where the latest value wins.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import itertools
+from collections import OrderedDict
+
+# Priority classes, most urgent first. Control snippets (start, stop,
+# halt, psi settings) go ahead of events (speech, TTS, faces arriving
+# and leaving), which go ahead of telemetry (face positions, sound,
+# audio, saliency, luminance). See AtomicMsgs for which is which.
+PRIO_CONTROL = 0
+PRIO_EVENT = 1
+PRIO_TELEMETRY = 2
+PRIORITIES = (PRIO_CONTROL, PRIO_EVENT, PRIO_TELEMETRY)
+
+# A first-in, first-out queue of snippets, with two twists.
+#
+# First, a snippet may be given a `key`, and if a snippet with the same
+# key is already waiting in the queue, the older one is thrown away.
+#
+# Most sensor data is state: the decibel level, the room brightness,
+# the salient point, where face 42 is. Only the most recent value of
+# each matters to the psi rules (that is why these are StateLinks).
+# If the cogserver falls behind, there is no point in making it
+# catch up on stale samples; it should get the newest one only.
+#
+# Snippets without a key (events: a face appeared, someone said
+# something) are never dropped.
+#
+# Second, each snippet has a priority, and there is a separate lane
+# for each.  Snippets come out of the most urgent non-empty lane first,
+# so that a "halt" never waits behind a backlog of sound poses. Within
+# a lane, the order is first-in, first-out.
+#
+class CoalescingQueue:
+
+	def __init__(self):
+		self.lanes = [OrderedDict() for p in PRIORITIES]
+
+		# The lane that each keyed snippet is waiting in.
+		self.lane_of = {}
+
+		# Unkeyed snippets get a unique private key.
+		self.serial = itertools.count()
+
+		# Number of stale snippets thrown away, ever.
+		self.dropped = 0
+
+	def __len__(self):
+		return sum(len(lane) for lane in self.lanes)
+
+	def __contains__(self, key):
+		return key in self.lane_of
+
+	def put(self, content, key=None, priority=PRIO_EVENT):
+		slot = key
+		if key is None:
+			slot = (None, next(self.serial))
+
+		# The replacement goes to the back of the queue, not into the
+		# slot of the one it replaces: it is the newest thing we know.
+		elif key in self.lane_of:
+			del self.lanes[self.lane_of[key]][key]
+			self.dropped += 1
+
+		if key is not None:
+			self.lane_of[key] = priority
+		self.lanes[priority][slot] = (key, content)
+
+	# Change snippets that are already waiting. `edits` is a dict of
+	# key to function; the content of the snippet waiting under each key
+	# (if any) is replaced by function(content), in place, or, if that
+	# returns None, the snippet is dropped.  This is how a face that is
+	# being deleted is taken out of the positions still waiting to go.
+	def revise(self, edits):
+		for (key, func) in edits.items():
+			if key not in self.lane_of:
+				continue
+			lane = self.lanes[self.lane_of[key]]
+			content = func(lane[key][1])
+			if content is None:
+				del lane[key]
+				del self.lane_of[key]
+			else:
+				lane[key] = (key, content)
+
+	# The priority of the most (or least) urgent snippet waiting, or
+	# None if the queue is empty.
+	def most_urgent(self):
+		for priority in PRIORITIES:
+			if self.lanes[priority]:
+				return priority
+		return None
+
+	def least_urgent(self):
+		for priority in reversed(PRIORITIES):
+			if self.lanes[priority]:
+				return priority
+		return None
+
+	# Remove and return the oldest of the most urgent snippets, as a
+	# (key, content, priority) tuple. The key is None for unkeyed
+	# snippets. With `least_urgent` set, remove the oldest of the least
+	# urgent ones instead; that is the one to throw away if the queue
+	# is full.
+	def pop(self, least_urgent=False):
+		if least_urgent:
+			priority = self.least_urgent()
+		else:
+			priority = self.most_urgent()
+		slot, (key, content) = self.lanes[priority].popitem(last=False)
+		if key is not None:
+			del self.lane_of[key]
+		return (key, content, priority)
+
+	# Remove and return all snippets, most urgent first, and oldest
+	# first within each priority.
+	def take_all(self):
+		contents = [content for lane in self.lanes
+			for (key, content) in lane.values()]
+		self.lanes = [OrderedDict() for p in PRIORITIES]
+		self.lane_of = {}
+		return contents
@@ -0,0 +1,150 @@
+#! /usr/bin/env python
+#
+# compact_receiver.py - Turn compact sensor records back into Atomese.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import socket
+import sys
+import threading
+import time
+
+import compact_wire
+from atomic_msgs import telemetry_scm, telemetry_key
+from coalesce import PRIO_TELEMETRY
+from netcat import CogServerPool
+
+# Reference receiver for the compact wire format (compact_wire.py).
+# It runs on the cogserver machine, accepts connections from the sensor
+# bridge (started with `AtomicMsgs(compact=True)`), and forwards each
+# record to the cogserver, as the same Atomese that AtomicMsgs would
+# have sent in the first place.
+#
+# The `transport` is where the Atomese goes; normally a CogServerPool,
+# with a single connection. Each sender gets a thread of its own here,
+# which forwards its records one at a time, in the order they arrived;
+# with one connection to the cogserver, they are also evaluated in that
+# order. (A pool of several connections would pin each sender thread to
+# one, which keeps each sender in order, but not the senders among
+# themselves.)
+# For tests, anything with a `send(content, key, priority)` method will
+# do, such as a list-collecting stand-in:
+#
+#    class Sink:
+#       def __init__(self): self.got = []
+#       def send(self, content, key=None, priority=None):
+#          self.got.append(content)
+#
+#    rcv = CompactReceiver(Sink(), port=0).start()
+#    atomo = AtomicMsgs(CogServerPool("localhost", rcv.port,
+#       shell=None, terminator=None), compact=True)
+#
+# Run it stand-alone, next to a cogserver:
+#
+#    ./compact_receiver.py [listen-port [cogserver-port]]
+#
+class CompactReceiver:
+
+	def __init__(self, transport, hostname="localhost", port=17021):
+		self.transport = transport
+		self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.listener.bind((hostname, port))
+		self.listener.listen(4)
+		self.port = self.listener.getsockname()[1]
+
+		self.records = 0
+
+		# How old the most recent record was, when it got here.
+		self.lag = 0.0
+		self.running = False
+
+	def start(self):
+		self.running = True
+		thr = threading.Thread(target=self.accept_loop)
+		thr.daemon = True
+		thr.start()
+		return self
+
+	def stop(self):
+		self.running = False
+		try:
+			self.listener.shutdown(socket.SHUT_RDWR)
+		except socket.error:
+			pass
+		self.listener.close()
+
+	def accept_loop(self):
+		while self.running:
+			try:
+				conn, addr = self.listener.accept()
+			except socket.error:
+				break
+			thr = threading.Thread(target=self.serve, args=(conn,))
+			thr.daemon = True
+			thr.start()
+
+	def serve(self, conn):
+		decoder = compact_wire.RecordDecoder()
+		while True:
+			try:
+				data = conn.recv(65536)
+			except socket.error:
+				break
+			if not data:
+				break
+			try:
+				records = decoder.feed(data)
+			except ValueError as msg:
+				# We've lost sync with the sender; there is no way to
+				# find the next record boundary. Hang up on it, and
+				# let it reconnect.
+				print "Compact receiver:", msg
+				break
+			for record in records:
+				self.forward(record)
+		conn.close()
+
+	def forward(self, record):
+		channel, stamp, payload = record
+		self.records += 1
+		self.lag = time.time() - stamp
+		if channel == compact_wire.CH_TEXT:
+			self.transport.send(payload)
+			return
+
+		# Face ids are integers; they travelled as doubles.
+		if channel == compact_wire.CH_FACE_OCTOMAP:
+			payload = (int(payload[0]),) + payload[1:]
+		self.transport.send(telemetry_scm(channel, payload),
+			telemetry_key(channel, payload), PRIO_TELEMETRY)
+
+if __name__ == "__main__":
+	port = 17021
+	cogport = 17020
+	if 1 < len(sys.argv):
+		port = int(sys.argv[1])
+	if 2 < len(sys.argv):
+		cogport = int(sys.argv[2])
+	rcv = CompactReceiver(CogServerPool("localhost", cogport, 1), port=port)
+	print "Compact receiver listening on port", rcv.port
+	rcv.start()
+	try:
+		while True:
+			time.sleep(1)
+	except KeyboardInterrupt:
+		rcv.stop()
@@ -0,0 +1,137 @@
+#
+# compact_wire.py - Compact binary records for high-rate sensor data.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import struct
+import time
+
+# Sending the full scheme text, such as
+#
+#    (StateLink (AnchorNode "Salient location") (List (NumberNode ...
+#
+# thirty times a second is wasteful, when all that changed are four
+# numbers. This defines an alternative: fixed-layout binary records,
+# each of which is just a channel id, a timestamp, and the numbers.
+# A receiver sitting next to the cogserver (see compact_receiver.py)
+# turns these back into exactly the same Atomese that AtomicMsgs
+# would have sent.
+#
+# Every record starts with the same header:
+#
+#    uint8    channel id
+#    uint8    number of values that follow (zero for text)
+#    float64  timestamp (seconds since the epoch)
+#
+# followed by that many little-endian float64 values. Anything that is
+# not numeric sensor data (control, speech, face events) is sent on the
+# text channel: the header, a uint32 byte count, and then the scheme
+# snippet itself, verbatim.
+#
+HEADER = struct.Struct("<BBd")
+TEXT_LENGTH = struct.Struct("<I")
+
+# Channel ids. Each numeric channel always carries the same number of
+# values, in the same order as the arguments of the AtomicMsgs method
+# of the same name.
+CH_TEXT = 0
+CH_FACE_OCTOMAP = 1    # faceid, x, y, z
+CH_SOUND = 2           # x, y, z
+CH_DECIBEL = 3         # decibel
+CH_BANG = 4            # decibel
+CH_SALIENCY = 5        # x, y, z, degree
+CH_LUMINANCE = 6       # brightness
+CH_DECIBEL_MEAN = 7    # decibel
+CH_LUMINANCE_TREND = 8 # brightness change per second
+
+WIDTHS = {
+	CH_FACE_OCTOMAP : 4,
+	CH_SOUND : 3,
+	CH_DECIBEL : 1,
+	CH_BANG : 1,
+	CH_SALIENCY : 4,
+	CH_LUMINANCE : 1,
+	CH_DECIBEL_MEAN : 1,
+	CH_LUMINANCE_TREND : 1,
+}
+
+# One precompiled Struct per record layout.
+LAYOUTS = dict((chan, struct.Struct("<BBd%dd" % width))
+	for (chan, width) in WIDTHS.items())
+
+def encode_record(channel, values, timestamp=None):
+	if timestamp is None:
+		timestamp = time.time()
+	return LAYOUTS[channel].pack(channel, len(values), timestamp, *values)
+
+def encode_text(content, timestamp=None):
+	if timestamp is None:
+		timestamp = time.time()
+	if isinstance(content, unicode):
+		content = content.encode("utf-8")
+	return HEADER.pack(CH_TEXT, 0, timestamp) + \
+		TEXT_LENGTH.pack(len(content)) + content
+
+# Incremental decoder. Feed it bytes, as they arrive off the socket,
+# in whatever pieces they come in; it returns the complete records,
+# as a list of (channel, timestamp, payload) tuples.  The payload is
+# a tuple of floats, or, for the text channel, a string.
+class RecordDecoder:
+
+	def __init__(self):
+		self.buffer = ""
+
+	def feed(self, data):
+		self.buffer += data
+		records = []
+		offset = 0
+		while True:
+			record, used = self.decode_one(offset)
+			if record is None:
+				break
+			records.append(record)
+			offset += used
+		self.buffer = self.buffer[offset:]
+		return records
+
+	# Decode the record starting at `offset`. Returns (None, 0) if
+	# it has not completely arrived yet.
+	def decode_one(self, offset):
+		avail = len(self.buffer) - offset
+		if avail < HEADER.size:
+			return (None, 0)
+
+		channel, count, stamp = HEADER.unpack_from(self.buffer, offset)
+		if channel == CH_TEXT:
+			start = offset + HEADER.size
+			if avail < HEADER.size + TEXT_LENGTH.size:
+				return (None, 0)
+			length, = TEXT_LENGTH.unpack_from(self.buffer, start)
+			used = HEADER.size + TEXT_LENGTH.size + length
+			if avail < used:
+				return (None, 0)
+			start += TEXT_LENGTH.size
+			return ((channel, stamp, self.buffer[start:start+length]), used)
+
+		if channel not in LAYOUTS or count != WIDTHS[channel]:
+			raise ValueError("Corrupt record: channel %d, %d values" %
+				(channel, count))
+		layout = LAYOUTS[channel]
+		if avail < layout.size:
+			return (None, 0)
+		values = layout.unpack_from(self.buffer, offset)[3:]
+		return ((channel, stamp, values), layout.size)
@@ -17,9 +17,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
 from std_msgs.msg import String
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 
 '''
     This implements a ROS node that subscribes to a mish-mash of
@@ -30,9 +30,11 @@ from atomic_msgs import AtomicMsgs
 '''
 
 class Control:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("/behavior_switch", String,
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe("/behavior_switch", String,
 			self.behavior_switch_cb)
 
 	# The 'btree_on' and 'btree_off' data-strings shouldn't be used,
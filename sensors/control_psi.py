@@ -17,10 +17,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
 import rosmsg
 import yaml
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 from dynamic_reconfigure.msg import Config
 
 
@@ -33,7 +33,7 @@ from dynamic_reconfigure.msg import Config
 '''
 
 class ControlPsi:
-	def __init__(self):
+	def __init__(self, atomo=None):
 		# A list of parameter names that are mirrored in opencog
 		# for controling psi-rules
 		self.param_list = []
@@ -42,8 +42,10 @@ class ControlPsi:
 		# atomspace values.
 		self.param_dict = {}
 
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("/opencog_control/parameter_updates", Config,
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe("/opencog_control/parameter_updates", Config,
 			self.openpsi_control_cb)
 
 	# For web-ui interface
@@ -0,0 +1,84 @@
+#
+# deadband.py - Suppress sensor updates that do not change anything.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import time
+
+# Per-channel deadband and rate filter, placed in front of AtomicMsgs.
+#
+# The audio power, luminance and saliency sensors publish at a fixed
+# rate, whether or not anything changed. Since these all end up in
+# StateLinks, sending the same value again does nothing in the
+# atomspace, except cost a parse.  So, for each channel, a new value
+# is passed on only if:
+#
+#  * it differs from the last value passed on by more than `epsilon`
+#    (for tuples, in any one component), and at least `min_interval`
+#    seconds have passed since then; or
+#  * nothing has been passed on for `heartbeat` seconds, so that the
+#    atomspace still gets refreshed now and then.
+#
+# Usage:
+#    db = Deadband()
+#    db.configure("decibel", epsilon=1.0, heartbeat=2.0)
+#    if db.allow("decibel", data.Decibel):
+#       atomo.audio_energy(data.Decibel)
+#
+class Deadband:
+
+	def __init__(self):
+		self.config = {}
+		self.last_value = {}
+		self.last_time = {}
+
+		# Number of updates held back, per channel.
+		self.suppressed = {}
+
+	def configure(self, channel, epsilon=0.0, min_interval=0.0, heartbeat=1.0):
+		self.config[channel] = (epsilon, min_interval, heartbeat)
+		self.suppressed.setdefault(channel, 0)
+
+	# Return True if the value should be sent, else False. Unconfigured
+	# channels get the default settings.
+	def allow(self, channel, value, now=None):
+		if now is None:
+			now = time.time()
+
+		if channel not in self.config:
+			self.configure(channel)
+		epsilon, min_interval, heartbeat = self.config[channel]
+
+		if channel in self.last_time:
+			elapsed = now - self.last_time[channel]
+			if elapsed < heartbeat:
+				if elapsed < min_interval or \
+				   not self.changed(self.last_value[channel], value, epsilon):
+					self.suppressed[channel] += 1
+					return False
+
+		self.last_value[channel] = value
+		self.last_time[channel] = now
+		return True
+
+	def changed(self, old, new, epsilon):
+		if isinstance(new, (tuple, list)):
+			for (a, b) in zip(old, new):
+				if epsilon < abs(b - a):
+					return True
+			return False
+		return epsilon < abs(new - old)
@@ -0,0 +1,65 @@
+#
+# face_predict.py - Predict where a face is, between camera frames.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+# pi_vision reports face locations about ten times a second, and each
+# one is already a little old by the time it arrives; by the time the
+# eyes move, the face has moved on. An alpha-beta filter tracks the
+# position and the velocity of one face, and so can say where the face
+# is most likely to be at any moment, not just at the last frame.
+#
+# `alpha` is how far each new measurement pulls the position estimate,
+# and `beta` how far it pulls the velocity estimate; both between 0
+# and 1. Predictions are extrapolated at most `max_horizon` seconds
+# past the last measurement; beyond that, a constant velocity is just
+# a guess, and the face is held where it was last predicted.
+#
+class AlphaBetaFilter:
+
+	def __init__(self, alpha=0.5, beta=0.1, max_horizon=0.5):
+		self.alpha = alpha
+		self.beta = beta
+		self.max_horizon = max_horizon
+		self.position = None
+		self.velocity = None
+		self.stamp = None
+
+	# A new measured (x, y, z) position, at time `stamp` (seconds).
+	def update(self, stamp, point):
+		if self.position is None:
+			self.position = list(point)
+			self.velocity = [0.0] * len(point)
+			self.stamp = stamp
+			return
+
+		dt = stamp - self.stamp
+		if dt <= 0.0:
+			self.position = list(point)
+			return
+
+		for i in range(len(self.position)):
+			predicted = self.position[i] + self.velocity[i] * dt
+			residual = point[i] - predicted
+			self.position[i] = predicted + self.alpha * residual
+			self.velocity[i] += self.beta * residual / dt
+		self.stamp = stamp
+
+	# The estimated (x, y, z) position at time `stamp`.
+	def predict(self, stamp):
+		dt = min(max(stamp - self.stamp, 0.0), self.max_horizon)
+		return tuple(p + v * dt for (p, v) in zip(self.position, self.velocity))
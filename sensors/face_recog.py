@@ -17,8 +17,8 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 
 from face_id.msg import f_id
 from face_id.msg import faces_ids
@@ -33,9 +33,11 @@ from face_id.msg import faces_ids
 # different face-recognition subsystems in use, document them, and
 # standardize on the message formats used.
 class FaceRecog:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber('/camera/face_recognition', faces_ids, self.face_cb)
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe('/camera/face_recognition', faces_ids, self.face_cb)
 
 	def face_cb(self, data):
 		for fc in data.faces:
@@ -17,13 +17,17 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
 
-import rospy
 import logging
+import threading
+import time
 
 from std_msgs.msg import Int32
 from pi_face_tracker.msg import FaceEvent, Faces
 
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe, get_param
+from face_predict import AlphaBetaFilter
+from face_ttl import TtlIndex
 
 logger = logging.getLogger('hr.eva_behavior.face_track')
 
@@ -43,13 +47,39 @@ class FaceTrack:
 	# control processes.)
 	C_FACE_TRACKING = C_FACE | C_EYES
 
-	def __init__(self):
+	def __init__(self, atomo=None):
 
 		# The OpenCog API. This is used to send face data to OpenCog.
-		self.atomo = AtomicMsgs()
-
-		# List of currently visible faces
-		self.visible_faces = []
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+
+		# Set of currently visible face ids
+		self.visible_faces = set()
+
+		# The faces are added and removed by the ROS callbacks, the face
+		# reaper and the predictor, each in its own thread. This lock
+		# guards the visible faces, their TTLs and their predictors. It
+		# is also held while sending anything that depends on which faces
+		# are visible, so that a face that is being removed is either in
+		# a position update that is already queued (and is taken out
+		# again, see forget_faces() in atomic_msgs.py), or in none at all.
+		self.lock = threading.RLock()
+
+		# When each visible face was last seen. Faces not seen for
+		# `face_reaper/ttl` seconds are removed, even if pi_vision never
+		# said that they were lost. Zero keeps them forever.
+		self.face_ttl = TtlIndex(get_param("face_reaper/ttl", 10.0))
+
+		# The faces that were reaped, and that pi_vision has not said
+		# were lost. pi_vision sends no second new_face event for them,
+		# so when one of them shows up in a camera frame again, it is
+		# added back.
+		self.reaped = set()
+
+		# Where each visible face is headed (see face_predict.py).
+		self.predict_params = get_param("face_prediction/filter", {})
+		self.predictors = {}
 
 		# Subscribed pi_vision topics and events
 		self.TOPIC_FACE_EVENT = "/camera/face_event"
@@ -62,37 +92,94 @@ class FaceTrack:
 		self.TOPIC_FACE_LOCATIONS = "/camera/face_locations"
 
 		# Face appearance/disappearance from pi_vision
-		rospy.Subscriber(self.TOPIC_FACE_EVENT, FaceEvent, self.face_event_cb)
+		subscribe(self.TOPIC_FACE_EVENT, FaceEvent, self.face_event_cb)
 
 		# Face location information from pi_vision
-		rospy.Subscriber(self.TOPIC_FACE_LOCATIONS, Faces, self.face_loc_cb)
+		subscribe(self.TOPIC_FACE_LOCATIONS, Faces, self.face_loc_cb)
 
-		rospy.Subscriber("/behavior_control", Int32, self.behavior_control_cb)
+		subscribe("/behavior_control", Int32, self.behavior_control_cb)
 
 		# Control Eyes and face by default
 		self.control_mode = 255
 
+		# Send predicted face positions this many times a second, in
+		# between the camera frames, so that the gaze follows smoothly.
+		# Zero sends only the camera frames.
+		self.predict_rate = get_param("face_prediction/rate", 0.0)
+		if 0 < self.predict_rate:
+			self.predictor_thread = threading.Thread(target=self.predict_loop)
+			self.predictor_thread.daemon = True
+			self.predictor_thread.start()
+
+		# Faces are reaped on every camera frame, and also every
+		# `face_reaper/interval` seconds, in case the frames stop.
+		if 0 < self.face_ttl.ttl:
+			self.reaper_interval = get_param("face_reaper/interval", 1.0)
+			self.reaper_thread = threading.Thread(target=self.reap_loop)
+			self.reaper_thread.daemon = True
+			self.reaper_thread.start()
+
 	# ----------------------------------------------------------
 	# Start tracking a face
 	def add_face(self, faceid):
-		if faceid in self.visible_faces:
-			return
+		with self.lock:
+			if faceid in self.visible_faces:
+				return
 
-		self.visible_faces.append(faceid)
+			self.visible_faces.add(faceid)
+			self.reaped.discard(faceid)
+			self.face_ttl.touch(faceid, time.time())
 
-		logger.info("New face added to visibile faces: " +
-			str(self.visible_faces))
-		self.atomo.add_face_to_atomspace(faceid)
+			logger.info("New face added to visibile faces: " +
+				str(sorted(self.visible_faces)))
+			self.atomo.add_face_to_atomspace(faceid)
 
 
-	# Stop tracking a face
+	# Stop tracking a face. It is forgotten before it is deleted, so
+	# that no new position of it can be sent after the delete.
 	def remove_face(self, faceid):
-		self.atomo.remove_face_from_atomspace(faceid)
+		with self.lock:
+			self.forget_face(faceid)
+			self.reaped.discard(faceid)
 
-		if faceid in self.visible_faces:
-			self.visible_faces.remove(faceid)
+			self.atomo.remove_face_from_atomspace(faceid)
+
+			logger.info("Lost face; visibile faces now: " +
+				str(sorted(self.visible_faces)))
 
-		logger.info("Lost face; visibile faces now: " + str(self.visible_faces))
+	# Stop tracking several faces; they are all deleted in one go.
+	def remove_faces(self, faceids):
+		with self.lock:
+			for faceid in faceids:
+				self.forget_face(faceid)
+
+			self.atomo.remove_faces_from_atomspace(faceids)
+
+			logger.info("Lost faces " + str(sorted(faceids)) +
+				"; visibile faces now: " + str(sorted(self.visible_faces)))
+
+	# Call with the lock held.
+	def forget_face(self, faceid):
+		self.visible_faces.discard(faceid)
+		self.face_ttl.remove(faceid)
+		self.predictors.pop(faceid, None)
+
+	# Remove the faces that have not been seen for a while.
+	def reap_faces(self, now):
+		if self.face_ttl.ttl <= 0:
+			return
+		with self.lock:
+			expired = self.face_ttl.expire(now)
+			if expired:
+				logger.info("Reaping faces not seen for %s seconds: %s" %
+					(self.face_ttl.ttl, sorted(expired)))
+				self.remove_faces(expired)
+				self.reaped.update(expired)
+
+	def reap_loop(self):
+		while True:
+			time.sleep(self.reaper_interval)
+			self.reap_faces(time.time())
 
 	# Force the robot to turn its attention to the given
 	# face (to interact with, talk with) that face.
@@ -133,16 +220,53 @@ class FaceTrack:
 
 	# pi_vision ROS callback, called when pi_vision has new face
 	# location data for us. This happens frequently (about 10x/second)
+	# The locations are stored in the OpenCog space server (octomap).
+	# All of the faces in the frame are sent in one go.
 	def face_loc_cb(self, data):
 		if not self.control_mode & self.C_FACE_TRACKING:
 			return
 
-		for face in data.faces:
-			# Update location of a face. The location is stored in the
-			# OpenCog space server (octomap).
-			if face.id in self.visible_faces:
-				self.atomo.update_face_octomap(face.id,
-				            face.point.x, face.point.y, face.point.z)
+		now = time.time()
+		with self.lock:
+			for face in data.faces:
+				if face.id in self.reaped:
+					self.add_face(face.id)
+
+			visible = self.visible_faces
+			faces = [(face.id, face.point.x, face.point.y, face.point.z)
+				for face in data.faces if face.id in visible]
+
+			for face in faces:
+				self.face_ttl.touch(face[0], now)
+			self.reap_faces(now)
+
+			for face in faces:
+				if face[0] not in self.predictors:
+					self.predictors[face[0]] = \
+						AlphaBetaFilter(**self.predict_params)
+				self.predictors[face[0]].update(now, face[1:])
+
+			self.atomo.update_face_octomaps(faces)
+
+	# The predicted positions of all the visible faces, at time `stamp`
+	# (default: now), as a list of (faceid, x, y, z) tuples.
+	def predicted_positions(self, stamp=None):
+		if stamp is None:
+			stamp = time.time()
+		with self.lock:
+			visible = self.visible_faces
+			return [(faceid,) + pred.predict(stamp)
+				for (faceid, pred) in self.predictors.items()
+				if faceid in visible]
+
+	def predict_loop(self):
+		interval = 1.0 / self.predict_rate
+		while True:
+			time.sleep(interval)
+			if self.control_mode & self.C_FACE_TRACKING:
+				with self.lock:
+					self.atomo.update_face_octomaps(
+						self.predicted_positions())
 
 
 	# Enable/disable Opencog face-tracking.  This is driven by the
@@ -159,8 +283,10 @@ class FaceTrack:
 		if facetracking > 0 and self.control_mode & self.C_FACE_TRACKING == 0:
 			self.atomo.update_ft_state_to_atomspace(False)
 			# Need to clear faces:
-			for face in self.visible_faces[:]:
-				self.remove_face(face)
+			with self.lock:
+				if self.visible_faces:
+					self.remove_faces(list(self.visible_faces))
+				self.reaped.clear()
 
 		elif self.control_mode & self.C_FACE_TRACKING > 0:
 			self.atomo.update_ft_state_to_atomspace(True)
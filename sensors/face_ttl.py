@@ -0,0 +1,68 @@
+#
+# face_ttl.py - Index of when each face was last seen.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import heapq
+import threading
+
+# pi_vision is supposed to send a `lost_face` event for every face that
+# goes away, but now and then it doesn't, and the face then stays in
+# the atomspace forever. This keeps track of when each face was last
+# seen, so that faces not seen for `ttl` seconds can be found, and
+# removed. A `ttl` of zero means that nothing ever expires.
+#
+# The faces are kept in a min-heap, ordered by when they were last
+# seen, so that finding the expired ones costs O(log n) per face, not
+# a scan of all of them.  Seeing a face again does not search the heap
+# for its old entry; a new entry is pushed, and the old one is skipped
+# when it comes to the top (the face's real last-seen time is kept in
+# a dict, on the side).
+#
+class TtlIndex:
+
+	def __init__(self, ttl=10.0):
+		self.ttl = ttl
+		self.heap = []
+		self.last_seen = {}
+		self.lock = threading.Lock()
+
+	def __len__(self):
+		return len(self.last_seen)
+
+	def touch(self, key, now):
+		if self.ttl <= 0:
+			return
+		with self.lock:
+			self.last_seen[key] = now
+			heapq.heappush(self.heap, (now, key))
+
+	def remove(self, key):
+		with self.lock:
+			self.last_seen.pop(key, None)
+
+	# Remove and return the keys not seen since `now - ttl`.
+	def expire(self, now):
+		deadline = now - self.ttl
+		expired = []
+		with self.lock:
+			while self.heap and self.heap[0][0] <= deadline:
+				stamp, key = heapq.heappop(self.heap)
+				if self.last_seen.get(key) == stamp:
+					del self.last_seen[key]
+					expired.append(key)
+		return expired
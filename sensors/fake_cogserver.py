@@ -0,0 +1,181 @@
+#! /usr/bin/env python
+#
+# fake_cogserver.py - Stand-in for the cogserver, for testing.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import re
+import socket
+import sys
+import threading
+import time
+
+# A fake cogserver. It listens on a TCP port, accepts any number of
+# connections, and records every line of scheme that it is sent,
+# together with the time that it arrived.  It does not evaluate
+# anything.  The shell-switching commands (`scm`, `scm hush`) are
+# swallowed, as the real cogserver would.  The one exception is
+# `(display "...\n")`, which is echoed back, so that the round-trip
+# pings of CogServerConnection.ping() get an answer.
+#
+# This is enough to exercise both netcat() and the persistent
+# CogServerConnection, without having opencog installed:
+#
+#    srv = FakeCogServer()
+#    srv.start()
+#    pool = CogServerPool("localhost", srv.port)
+#    pool.send("(halt)")
+#    srv.wait_for(1)
+#    print srv.lines
+#
+# Run it stand-alone, to watch what the sensor bridge is sending:
+#
+#    ./fake_cogserver.py 17020
+#
+DISPLAY = re.compile(r'^\(display "([^"\\]*)\\n"\)$')
+
+class FakeCogServer:
+
+	def __init__(self, hostname="localhost", port=0, verbose=False):
+		self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.listener.bind((hostname, port))
+		self.listener.listen(16)
+
+		# If port zero was asked for, the OS picked one for us.
+		self.hostname = hostname
+		self.port = self.listener.getsockname()[1]
+		self.verbose = verbose
+
+		# List of (arrival-time, line) tuples.
+		self.received = []
+		self.connections = 0
+		self.open_socks = []
+		self.cond = threading.Condition()
+		self.running = False
+
+	@property
+	def lines(self):
+		with self.cond:
+			return [line for (when, line) in self.received]
+
+	def start(self):
+		self.running = True
+		thr = threading.Thread(target=self.accept_loop)
+		thr.daemon = True
+		thr.start()
+		return self
+
+	# Shut down the listener and hang up on all open connections,
+	# the way a crashing cogserver would.
+	def stop(self):
+		self.running = False
+		try:
+			self.listener.shutdown(socket.SHUT_RDWR)
+		except socket.error:
+			pass
+		self.listener.close()
+		with self.cond:
+			socks = self.open_socks[:]
+		for conn in socks:
+			try:
+				conn.shutdown(socket.SHUT_RDWR)
+			except socket.error:
+				pass
+
+	def clear(self):
+		with self.cond:
+			self.received = []
+
+	# Block until at least `count` lines have arrived. Returns True
+	# if they did, False if the timeout expired first.
+	def wait_for(self, count, timeout=5.0):
+		deadline = time.time() + timeout
+		with self.cond:
+			while len(self.received) < count:
+				remaining = deadline - time.time()
+				if remaining <= 0:
+					return False
+				self.cond.wait(remaining)
+		return True
+
+	def accept_loop(self):
+		while self.running:
+			try:
+				conn, addr = self.listener.accept()
+			except socket.error:
+				break
+			with self.cond:
+				self.connections += 1
+				self.open_socks.append(conn)
+			thr = threading.Thread(target=self.serve, args=(conn,))
+			thr.daemon = True
+			thr.start()
+
+	def serve(self, conn):
+		pending = ""
+		while True:
+			try:
+				data = conn.recv(65536)
+			except socket.error:
+				break
+			if not data:
+				break
+			pending += data
+			lines = pending.split("\n")
+			pending = lines.pop()
+			self.record(lines)
+			self.echo(conn, lines)
+
+		if pending:
+			self.record([pending])
+		with self.cond:
+			self.open_socks.remove(conn)
+		conn.close()
+
+	def echo(self, conn, lines):
+		for line in lines:
+			m = DISPLAY.match(line.strip())
+			if m:
+				try:
+					conn.sendall(m.group(1) + "\n")
+				except socket.error:
+					pass
+
+	def record(self, lines):
+		now = time.time()
+		with self.cond:
+			for line in lines:
+				if line.strip() in ("", "scm", "scm hush"):
+					continue
+				if self.verbose:
+					print "cogserver got:", line
+				self.received.append((now, line))
+			self.cond.notify_all()
+
+if __name__ == "__main__":
+	port = 17020
+	if 1 < len(sys.argv):
+		port = int(sys.argv[1])
+	srv = FakeCogServer(port=port, verbose=True)
+	print "Fake cogserver listening on port", srv.port
+	srv.start()
+	try:
+		while True:
+			time.sleep(1)
+	except KeyboardInterrupt:
+		srv.stop()
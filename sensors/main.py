@@ -26,33 +26,65 @@ sys.path.append("/opt/hansonrobotics/ros/lib/python2.7/dist-packages/")
 
 import logging
 import rospy
-from affect import Affect
-from audio_power import AudioPower
-from chat_track import ChatTrack
-from control import Control
-from control_psi import ControlPsi
-from face_recog import FaceRecog
-from face_track import FaceTrack
-from sound_track import SoundTrack
-from room_brightness import RoomBrightness
-from saliency_track import SaliencyTrack
-from tts_feedback import TTSFeedback
+from atomic_msgs import AtomicMsgs
+from adaptive_rate import AdaptiveRate
+from metrics_pub import MetricsPublisher
+from recorder import Recorder
+import subscribe
+from bridges import load_bridges, print_report, read_config
 
 rospy.init_node("OpenCog_ROS_bridge")
 logging.info("Starting the OpenCog ROS Bridge")
 print "Starting the OpenCog ROS Bridge"
 
-co = Control()
-cp = ControlPsi()
-af = Affect()
-ap = AudioPower()
-ct = ChatTrack()
-fc = FaceRecog()
-ft = FaceTrack()
-st = SoundTrack()
-br = RoomBrightness()
-sl = SaliencyTrack()
-tf = TTSFeedback
+# All of the bridges share one connection to the cogserver, so that
+# batching, coalescing, queueing and connection reuse apply to all of
+# the traffic. How it talks to the cogserver is set with ROS params;
+# the defaults are the same as if there were no params at all.
+atomo = AtomicMsgs(
+	hostname = rospy.get_param("~cogserver_host", "localhost"),
+	port = rospy.get_param("~cogserver_port", 17020),
+	connections = rospy.get_param("~connections", 1),
+	batch_interval = rospy.get_param("~batch_interval", 0.0),
+	batch_size = rospy.get_param("~batch_size", 64),
+	queue_size = rospy.get_param("~queue_size", 0),
+	overflow = rospy.get_param("~overflow", "drop-oldest"),
+	compact = rospy.get_param("~compact", False),
+	compact_port = rospy.get_param("~compact_port", 17021))
+
+# Turn down the face, sound and saliency rates when the cogserver is
+# slow to answer. Set `~adaptive_rate` to true, or to a dict of the
+# AdaptiveRate settings, e.g. {rates: {octomap: 30, sound: 20}, high: 0.2}
+adaptive = rospy.get_param("~adaptive_rate", False)
+if adaptive and atomo.compact:
+	print "Adaptive rate needs a scheme shell to ping; not with ~compact"
+elif adaptive:
+	if adaptive is True:
+		adaptive = {}
+	rates = adaptive.pop("rates",
+		{"octomap": 30.0, "sound": 30.0, "saliency": 30.0})
+	atomo.governor = AdaptiveRate(atomo.ping, rates, **adaptive)
+
+# Record everything the bridges see, for replay.py to play back later.
+record_path = rospy.get_param("~record", "")
+if record_path:
+	recorder = Recorder(record_path)
+	subscribe.set_recorder(recorder)
+	rospy.on_shutdown(recorder.close)
+	print "Recording the session to", record_path
+
+# Which bridges to run: the `~bridges` list, or else the list in the
+# `~bridges_file` YAML file, or else all of them. See bridges.py.
+names = rospy.get_param("~bridges", None)
+if names is None and rospy.has_param("~bridges_file"):
+	names = read_config(rospy.get_param("~bridges_file"))
+bridges, report = load_bridges(atomo, names)
+print_report(report)
+
+# Message rates, callback times, cogserver latency and queue depths.
+mp = MetricsPublisher(atomo,
+	period = rospy.get_param("~metrics_period", 5.0),
+	path = rospy.get_param("~metrics_file", None))
 
 try:
 	rospy.spin()
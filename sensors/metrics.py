@@ -0,0 +1,228 @@
+#
+# metrics.py - Counters, gauges and latency histograms for the bridge.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import bisect
+import threading
+import time
+
+# How far behind is the bridge?  Every subscriber callback, and every
+# write to the cogserver, is counted and timed here, in one global
+# registry, METRICS.  The registry can be printed as plain text (for
+# people), or in the Prometheus text format (for graphing); see
+# metrics_pub.py for how it gets published.
+#
+# Metrics have a name, and optionally some labels, e.g.
+#
+#    METRICS.counter("bridge_messages_total", topic="audio_sensors").inc()
+#    METRICS.histogram("cogserver_send_seconds").observe(0.0012)
+#    METRICS.gauge("bridge_send_queue_depth", sender.depth)
+#
+# Asking for the same name and labels again returns the same metric.
+# This module does not use ROS, so that the transports can use it too.
+
+# A count of events, and its recent rate, in events per second.
+# The rate is the count over the current and the previous `period`.
+class Counter:
+
+	def __init__(self, period=10.0):
+		self.lock = threading.Lock()
+		self.value = 0
+		self.period = period
+		self.start = time.time()
+		self.current = 0
+		self.previous = 0
+
+	def inc(self, amount=1):
+		now = time.time()
+		with self.lock:
+			self.value += amount
+			self.roll(now)
+			self.current += amount
+
+	def roll(self, now):
+		if self.period <= now - self.start:
+			if 2 * self.period <= now - self.start:
+				self.previous = 0
+			else:
+				self.previous = self.current
+			self.current = 0
+			self.start = now
+
+	def rate(self):
+		now = time.time()
+		with self.lock:
+			self.roll(now)
+			return (self.previous + self.current) / \
+				(self.period + now - self.start)
+
+# Default bucket bounds for latencies, in seconds.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+	0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Histogram of observed values (usually durations, in seconds), kept as
+# counts in fixed buckets: each observation costs a bisect and an add.
+class Histogram:
+
+	def __init__(self, bounds=LATENCY_BUCKETS):
+		self.lock = threading.Lock()
+		self.bounds = tuple(bounds)
+		self.counts = [0] * (len(self.bounds) + 1)
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, value):
+		idx = bisect.bisect_left(self.bounds, value)
+		with self.lock:
+			self.counts[idx] += 1
+			self.count += 1
+			self.sum += value
+
+	# Estimate a quantile (0.5 for the median, 0.99, ...) as the upper
+	# bound of the bucket it falls in. None if nothing was observed.
+	def quantile(self, q):
+		with self.lock:
+			if 0 == self.count:
+				return None
+			want = q * self.count
+			seen = 0
+			for (idx, n) in enumerate(self.counts):
+				seen += n
+				if want <= seen:
+					break
+		if idx < len(self.bounds):
+			return self.bounds[idx]
+		return float("inf")
+
+class Metrics:
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.counters = {}
+		self.histograms = {}
+		self.gauges = {}
+
+	@staticmethod
+	def key(name, labels):
+		return (name, tuple(sorted(labels.items())))
+
+	def counter(self, name, **labels):
+		key = self.key(name, labels)
+		with self.lock:
+			if key not in self.counters:
+				self.counters[key] = Counter()
+			return self.counters[key]
+
+	def histogram(self, name, **labels):
+		key = self.key(name, labels)
+		with self.lock:
+			if key not in self.histograms:
+				self.histograms[key] = Histogram()
+			return self.histograms[key]
+
+	# A gauge is a function, called when the metrics are dumped, that
+	# returns the current value (e.g. the length of a queue).
+	def gauge(self, name, func, **labels):
+		with self.lock:
+			self.gauges[self.key(name, labels)] = func
+
+	# Wrap a callback so that its calls, duration and exceptions are
+	# recorded, under the given name (usually the ROS topic).
+	def timed(self, name, callback):
+		calls = self.counter("bridge_messages_total", topic=name)
+		errors = self.counter("bridge_callback_errors_total", topic=name)
+		duration = self.histogram("bridge_callback_seconds", topic=name)
+		def wrapper(*args):
+			start = time.time()
+			try:
+				return callback(*args)
+			except Exception:
+				errors.inc()
+				raise
+			finally:
+				duration.observe(time.time() - start)
+				calls.inc()
+		return wrapper
+
+	# ------------------------------------------------------------
+	# Output
+
+	@staticmethod
+	def label_string(labels):
+		if not labels:
+			return ""
+		return "{" + ",".join('%s="%s"' % (k, str(v).replace('"', '\\"'))
+			for (k, v) in labels) + "}"
+
+	def items(self, table):
+		with self.lock:
+			return sorted(table.items())
+
+	def gauge_value(self, func):
+		try:
+			return func()
+		except Exception:
+			return None
+
+	# Human-readable summary, one metric per line.
+	def dump_text(self):
+		lines = []
+		for ((name, labels), ctr) in self.items(self.counters):
+			lines.append("%s%s %d (%.1f/sec)" % (name,
+				self.label_string(labels), ctr.value, ctr.rate()))
+		for ((name, labels), hist) in self.items(self.histograms):
+			p50 = hist.quantile(0.5)
+			p99 = hist.quantile(0.99)
+			if p50 is None:
+				continue
+			lines.append("%s%s n=%d mean=%.6f p50<=%g p99<=%g" % (name,
+				self.label_string(labels), hist.count,
+				hist.sum / hist.count, p50, p99))
+		for ((name, labels), func) in self.items(self.gauges):
+			lines.append("%s%s %s" % (name, self.label_string(labels),
+				self.gauge_value(func)))
+		return "\n".join(lines) + "\n"
+
+	# The Prometheus text exposition format.
+	def dump_prometheus(self):
+		lines = []
+		for ((name, labels), ctr) in self.items(self.counters):
+			lines.append("%s%s %d" % (name, self.label_string(labels),
+				ctr.value))
+		for ((name, labels), hist) in self.items(self.histograms):
+			with hist.lock:
+				counts = list(hist.counts)
+				total = hist.count
+				hsum = hist.sum
+			seen = 0
+			bounds = [repr(b) for b in hist.bounds] + ["+Inf"]
+			for (bound, n) in zip(bounds, counts):
+				seen += n
+				lines.append("%s_bucket%s %d" % (name,
+					self.label_string(labels + (("le", bound),)), seen))
+			lines.append("%s_sum%s %r" % (name, self.label_string(labels), hsum))
+			lines.append("%s_count%s %d" % (name, self.label_string(labels), total))
+		for ((name, labels), func) in self.items(self.gauges):
+			value = self.gauge_value(func)
+			if value is not None:
+				lines.append("%s%s %r" % (name, self.label_string(labels),
+					value))
+		return "\n".join(lines) + "\n"
+
+# The one and only registry.
+METRICS = Metrics()
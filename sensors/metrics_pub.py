@@ -0,0 +1,59 @@
+#
+# metrics_pub.py - Publish the bridge metrics on a ROS topic.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import os
+import rospy
+from std_msgs.msg import String
+from metrics import METRICS
+
+'''
+    Every `period` seconds, ping the cogserver (to measure the round
+    trip time), and then publish a plain-text dump of all of the bridge
+    metrics on the `~metrics` topic:
+
+        rostopic echo /OpenCog_ROS_bridge/metrics
+
+    If `path` is given, the metrics are also written to that file, in
+    the Prometheus text format. Point the node_exporter textfile
+    collector at it to graph them.
+'''
+
+class MetricsPublisher:
+	def __init__(self, atomo, period=5.0, path=None):
+		self.atomo = atomo
+		self.path = path
+		self.pub = rospy.Publisher("~metrics", String, queue_size=1)
+		self.timer = rospy.Timer(rospy.Duration(period), self.publish_cb)
+
+	def publish_cb(self, event):
+		self.atomo.ping()
+		self.pub.publish(String(METRICS.dump_text()))
+		if self.path:
+			self.write(self.path)
+
+	# Write to a temp file, then rename, so that a scraper never reads
+	# a half-written file.
+	def write(self, path):
+		tmp = path + ".tmp"
+		try:
+			with open(tmp, "w") as f:
+				f.write(METRICS.dump_prometheus())
+			os.rename(tmp, path)
+		except (IOError, OSError) as e:
+			print "Can't write metrics to", path, ":", e
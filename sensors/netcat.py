@@ -18,7 +18,12 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
+import itertools
+import select
 import socket
+import threading
+import time
+from metrics import METRICS
 
 # This implements netcat in python.
 #
@@ -26,6 +31,7 @@ import socket
 # Its important and not complicated.
 #
 def netcat(hostname, port, content) :
+	start = time.time()
 	s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
 	# If the cogserver is down, the connection will fail.
@@ -34,6 +40,7 @@ def netcat(hostname, port, content) :
 	except socket.error as msg:
 		print "Connect failed: ", msg
 		s.close()
+		METRICS.counter("cogserver_send_failures_total", via="netcat").inc()
 		return 1  # non-zero means failure
 
 	s.sendall(content)
@@ -45,4 +52,225 @@ def netcat(hostname, port, content) :
 		# print "Received:", repr(data)
 	# print "Connection closed."
 	s.close()
+
+	# The cogserver closes its end only after it has evaluated the
+	# snippet, so this is the full round trip.
+	METRICS.histogram("cogserver_send_seconds", via="netcat").observe(
+		time.time() - start)
 	return 0  # zero means success
+
+# ----------------------------------------------------------------
+# A long-lived connection to the cogserver.
+#
+# The netcat() above opens a brand-new TCP connection for every
+# snippet. That is fine for the occasional control message, but the
+# face, sound and audio sensors send tens of snippets per second, and
+# the TCP handshakes (and the TIME_WAIT sockets they leave behind)
+# then dominate the cost.  The class below opens one connection,
+# switches it into a quiet scheme shell, and then just keeps writing
+# snippets down the same socket.
+#
+# If the cogserver goes away, the connection is re-opened, with an
+# exponential backoff, so that a dead cogserver does not get hammered
+# with connection attempts at sensor rates.  Snippets sent while the
+# cogserver is down are dropped, just as netcat() drops them.
+#
+class CogServerConnection:
+
+	def __init__(self, hostname, port, shell="scm hush\n", terminator="\n",
+	             min_backoff=0.1, max_backoff=5.0, timeout=5.0):
+		self.hostname = hostname
+		self.port = port
+
+		# The command that starts the scheme shell. `hush` turns off
+		# the prompts, so that there is (almost) nothing to read back.
+		# Each snippet must end with the `terminator`; it is added if
+		# it is missing. Both may be set to None for binary data.
+		self.shell = shell
+		self.terminator = terminator
+		self.timeout = timeout
+
+		self.min_backoff = min_backoff
+		self.max_backoff = max_backoff
+		self.backoff = min_backoff
+		self.next_attempt = 0.0
+
+		self.sock = None
+		self.pings = 0
+
+		self.send_time = METRICS.histogram("cogserver_send_seconds",
+			via="connection")
+		self.failures = METRICS.counter("cogserver_send_failures_total",
+			via="connection")
+		self.reconnects = METRICS.counter("cogserver_connects_total")
+
+	# Open the socket, unless it is already open, or unless we are
+	# still backing off from a previous failure.
+	def connect(self):
+		if self.sock:
+			return True
+
+		now = time.time()
+		if now < self.next_attempt:
+			return False
+
+		try:
+			s = socket.create_connection((self.hostname, self.port),
+			                             self.timeout)
+			s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			if self.shell:
+				s.sendall(self.shell)
+		except socket.error as msg:
+			print "Connect failed: ", msg
+			self.next_attempt = now + self.backoff
+			self.backoff = min(2.0 * self.backoff, self.max_backoff)
+			return False
+
+		self.sock = s
+		self.backoff = self.min_backoff
+		self.reconnects.inc()
+		return True
+
+	def close(self):
+		if self.sock:
+			self.sock.close()
+		self.sock = None
+
+	# Read and discard whatever the cogserver has written back, without
+	# blocking. If this is not done, the receive buffer fills up, and
+	# the cogserver eventually stalls.  A zero-length read means that
+	# the cogserver hung up on us.
+	def drain(self):
+		while True:
+			readable, _, _ = select.select([self.sock], [], [], 0)
+			if not readable:
+				return
+			data = self.sock.recv(4096)
+			if not data:
+				raise socket.error("cogserver closed the connection")
+
+	# Send one snippet. Returns zero on success, non-zero on failure,
+	# just like netcat(). A connection that turns out to be dead is
+	# re-opened once, and the snippet is re-sent on the new connection.
+	def send(self, content):
+		if isinstance(content, unicode):
+			content = content.encode("utf-8")
+		if self.terminator and not content.endswith(self.terminator):
+			content += self.terminator
+
+		start = time.time()
+		for attempt in range(2):
+			if not self.connect():
+				break
+			try:
+				self.drain()
+				self.sock.sendall(content)
+				self.drain()
+				self.send_time.observe(time.time() - start)
+				return 0
+			except socket.error as msg:
+				print "Cogserver connection lost: ", msg
+				self.close()
+
+		self.failures.inc()
+		return 1
+
+	# Measure the round-trip time to the cogserver, in seconds. Unlike
+	# send(), which only waits for the snippet to be written to the
+	# socket, this waits until the cogserver has evaluated a snippet and
+	# written back its output. Returns None if there was no reply within
+	# `timeout` seconds, or if this is not a scheme shell.
+	def ping(self, timeout=2.0):
+		if not self.shell or not self.connect():
+			return None
+		self.pings += 1
+		token = "pong-%d" % self.pings
+		start = time.time()
+		try:
+			self.drain()
+			self.sock.sendall('(display "%s\\n")\n' % token)
+			reply = ""
+			while token not in reply:
+				remaining = start + timeout - time.time()
+				readable, _, _ = select.select([self.sock], [], [],
+					max(remaining, 0))
+				if not readable:
+					METRICS.counter("cogserver_ping_timeouts_total").inc()
+					return None
+				data = self.sock.recv(4096)
+				if not data:
+					raise socket.error("cogserver closed the connection")
+				reply += data
+		except socket.error as msg:
+			print "Cogserver connection lost: ", msg
+			self.close()
+			return None
+
+		rtt = time.time() - start
+		METRICS.histogram("cogserver_roundtrip_seconds").observe(rtt)
+		return rtt
+
+# A small pool of CogServerConnections, safe to use from the many
+# threads that rospy runs subscriber callbacks in.
+#
+# The cogserver evaluates the snippets that arrive on one connection in
+# the order they were sent, but there is no order at all between
+# different connections.  So each thread is pinned to one connection,
+# the first time that it sends, and always uses that one after: the
+# snippets of any one thread (`(disable-all-demos)` and then `(halt)`,
+# or a new face and then its position) are evaluated in order. Snippets
+# from different threads, sent at about the same time, may be evaluated
+# in either order, unless `size` is 1 (the default); then everything
+# is evaluated in the order in which it was sent.
+#
+# Unlike netcat(), which waited for the cogserver to hang up, send()
+# returns as soon as the snippet is written to the socket. Because the
+# shell is shared by all later snippets, a snippet with an unbalanced
+# parenthesis or double-quote stalls the connection for all of them;
+# snippets built from untrusted text must be checked first (see
+# balanced() in scm_format.py, and AtomicMsgs.evaluate_scm()).
+#
+# ping() has a connection of its own, opened on the first ping. It
+# waits for the cogserver to answer, for up to a couple of seconds,
+# and the sending threads must not wait on it. That connection measures
+# how busy the cogserver is; it does not see the snippets that are
+# still in flight on the others.
+class CogServerPool:
+
+	def __init__(self, hostname, port, size=1, **kwargs):
+		self.hostname = hostname
+		self.port = port
+		self.conns = [CogServerConnection(hostname, port, **kwargs)
+			for i in range(size)]
+		self.locks = [threading.Lock() for conn in self.conns]
+
+		# Which connection each thread is pinned to.
+		self.pinned = threading.local()
+		self.assigned = itertools.count()
+
+		self.pinger = CogServerConnection(hostname, port, **kwargs)
+		self.ping_lock = threading.Lock()
+
+	def slot(self):
+		idx = getattr(self.pinned, "idx", None)
+		if idx is None:
+			idx = next(self.assigned) % len(self.conns)
+			self.pinned.idx = idx
+		return idx
+
+	# Nothing is queued here, so there is nothing to coalesce or
+	# reorder; the key and the priority are ignored.
+	def send(self, content, key=None, priority=None):
+		idx = self.slot()
+		with self.locks[idx]:
+			return self.conns[idx].send(content)
+
+	def ping(self, timeout=2.0):
+		with self.ping_lock:
+			return self.pinger.ping(timeout)
+
+	def close(self):
+		for conn in self.conns:
+			conn.close()
+		with self.ping_lock:
+			self.pinger.close()
@@ -0,0 +1,71 @@
+#
+# onset.py - Detect sudden sounds from the loudness stream.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import math
+from ring_buffer import TimeSeries
+
+# Onset detector for loud bangs, claps and shouts.
+#
+# The background loudness is tracked over a sliding window of the last
+# `window` seconds of decibel samples (using the running mean and
+# variance of a TimeSeries, so each sample costs O(1)). A new sample
+# is an onset if it stands out from that background by at least
+# `threshold` standard deviations (its z-score) AND by at least
+# `min_rise` decibels. The second test keeps a very quiet, very steady
+# room from reporting every cough as an explosion.
+#
+# After an onset, further onsets are ignored for `refractory` seconds;
+# a single bang is usually loud for several frames in a row.
+#
+# `update()` returns the confidence that this sample is an onset: 0.0
+# for none, and otherwise a number between 0.5 (just at the threshold)
+# and 1.0 (far above it).
+#
+class OnsetDetector:
+
+	def __init__(self, window=2.0, threshold=3.0, min_rise=6.0,
+	             refractory=0.5, min_samples=5, min_stddev=1.0,
+	             capacity=512):
+		self.background = TimeSeries(capacity, window)
+		self.threshold = threshold
+		self.min_rise = min_rise
+		self.refractory = refractory
+		self.min_samples = min_samples
+
+		# Don't let a perfectly steady background make the z-score
+		# blow up.
+		self.min_stddev = min_stddev
+
+		self.last_onset = None
+
+	def update(self, stamp, decibel):
+		confidence = 0.0
+		bg = self.background
+		if self.min_samples <= len(bg) and (self.last_onset is None or
+		   self.refractory <= stamp - self.last_onset):
+			rise = decibel - bg.mean()
+			z = rise / max(bg.stddev(), self.min_stddev)
+			if self.threshold <= z and self.min_rise <= rise:
+				confidence = 1.0 / (1.0 + math.exp(self.threshold - z))
+				self.last_onset = stamp
+
+		# The sample joins the background only after being compared to
+		# it; otherwise a bang would raise its own bar.
+		bg.push(stamp, decibel)
+		return confidence
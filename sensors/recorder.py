@@ -0,0 +1,57 @@
+#
+# recorder.py - Record what the sensor bridges see, for later replay.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import time
+import yaml
+import rosbag
+import rospy
+from std_msgs.msg import String
+
+# The topic, in the bag, on which the params are recorded.
+PARAMS_TOPIC = "/opencog_bridge/params"
+
+# Writes every message that the bridges receive into a rosbag, exactly
+# as it arrived, stamped with its arrival time.  Every ROS param that
+# the bridges read is recorded too (as YAML, on PARAMS_TOPIC), so that
+# a replay sets the bridges up exactly as they were.
+#
+# A rosbag keeps the message definitions along with the messages, so
+# the recording can be read back even where the message packages
+# (hr_msgs, pi_face_tracker, ...) are not installed. See replay.py.
+#
+class Recorder:
+
+	def __init__(self, path):
+		self.bag = rosbag.Bag(path, "w")
+		self.lock = threading.Lock()
+
+	def record(self, topic, msg):
+		with self.lock:
+			if self.bag:
+				self.bag.write(topic, msg, rospy.Time.from_sec(time.time()))
+
+	def param(self, name, value):
+		self.record(PARAMS_TOPIC, String(yaml.safe_dump({name: value})))
+
+	def close(self):
+		with self.lock:
+			if self.bag:
+				self.bag.close()
+			self.bag = None
@@ -0,0 +1,132 @@
+#! /usr/bin/env python
+#
+# replay.py - Replay a recorded session through the sensor bridges.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import argparse
+import time
+import yaml
+import rosbag
+
+import subscribe
+from atomic_msgs import AtomicMsgs
+from bridges import load_bridges, print_report
+from fake_cogserver import FakeCogServer
+from metrics import METRICS
+from recorder import PARAMS_TOPIC
+
+# Drive the sensor bridges from a recording made with
+#
+#    rosparam set /OpenCog_ROS_bridge/record /tmp/session.bag
+#
+# No ROS master, blender or cogserver is needed: the bridges are
+# created offline (see subscribe.py), and the recorded messages are
+# handed straight to their callbacks, at the recorded pace, N times
+# faster, or as fast as possible:
+#
+#    ./replay.py /tmp/session.bag             # real time
+#    ./replay.py /tmp/session.bag --speed 10
+#    ./replay.py /tmp/session.bag --speed 0   # flat out
+#
+# The scheme goes to a FakeCogServer, on port 17020, which records
+# when each line arrives; use --cogserver to send to a real cogserver,
+# already running on that port, instead.  At the end, the throughput
+# and the bridge metrics (callback times, send latency, queue depths)
+# are printed.
+#
+# The bridges stamp samples with the wall-clock time, not the recorded
+# time; at high speeds, time-based settings (deadband intervals, onset
+# refractory periods, history windows) see a compressed session.
+
+def load_params(bag):
+	params = {}
+	for (topic, msg, stamp) in bag.read_messages(topics=[PARAMS_TOPIC]):
+		params.update(yaml.safe_load(msg.data))
+	return params
+
+# Hand every recorded message to the bridges. `speed` is the replay
+# rate relative to the recording; zero means no waiting at all.
+def replay(bag, speed):
+	count = 0
+	first = None
+	start = time.time()
+	for (topic, msg, stamp) in bag.read_messages():
+		if topic == PARAMS_TOPIC:
+			continue
+		if first is None:
+			first = stamp.to_sec()
+		if 0 < speed:
+			delay = start + (stamp.to_sec() - first) / speed - time.time()
+			if 0 < delay:
+				time.sleep(delay)
+		if subscribe.deliver(topic, msg):
+			count += 1
+	return count
+
+def main():
+	parser = argparse.ArgumentParser(
+		description="Replay a recorded session through the sensor bridges.")
+	parser.add_argument("bag", help="rosbag made by the bridge recorder")
+	parser.add_argument("--speed", type=float, default=1.0,
+		help="replay speed; 1 is real time, 0 is as fast as possible")
+	parser.add_argument("--port", type=int, default=17020)
+	parser.add_argument("--cogserver", action="store_true",
+		help="send to a running cogserver, instead of a fake one")
+	parser.add_argument("--batch-interval", type=float, default=0.0)
+	parser.add_argument("--queue-size", type=int, default=0)
+	parser.add_argument("--bridges", nargs="+",
+		help="bridges to run (default: all); see bridges.py")
+	args = parser.parse_args()
+
+	bag = rosbag.Bag(args.bag)
+	subscribe.go_offline(load_params(bag))
+
+	server = None
+	if not args.cogserver:
+		server = FakeCogServer(port=args.port).start()
+
+	atomo = AtomicMsgs(port=args.port, batch_interval=args.batch_interval,
+		queue_size=args.queue_size)
+	bridges, report = load_bridges(atomo, args.bridges)
+	print_report(report)
+
+	start = time.time()
+	count = replay(bag, args.speed)
+	elapsed = time.time() - start
+	bag.close()
+
+	print "Replayed %d messages in %.3f sec: %.1f msgs/sec" % (
+		count, elapsed, count / max(elapsed, 1e-9))
+
+	if server:
+		# Wait for the queues to drain; anything still arriving after a
+		# second of silence is not worth waiting for.
+		nlines = -1
+		while nlines != len(server.received):
+			nlines = len(server.received)
+			time.sleep(1.0)
+		if server.received:
+			last = server.received[-1][0] - start
+			print "Cogserver got %d lines in %.3f sec: %.1f lines/sec" % (
+				nlines, last, nlines / max(last, 1e-9))
+		server.stop()
+
+	print METRICS.dump_text()
+
+if __name__ == "__main__":
+	main()
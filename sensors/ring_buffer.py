@@ -0,0 +1,150 @@
+#
+# ring_buffer.py - Fixed-size sensor history, with windowed statistics.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import math
+from array import array
+
+# The recent history of one sensor channel: (timestamp, value) samples,
+# kept in two preallocated arrays of doubles, used as a ring buffer.
+# Nothing is allocated per sample.
+#
+# Only the samples from the last `window` seconds count; older ones are
+# dropped as new ones arrive (as are the oldest ones, once `capacity`
+# samples are held). Running sums are kept over the samples in the
+# window, so that the mean, variance and trend cost O(1), no matter
+# how many samples there are.  This lets the bridge send a summary
+# ("mean decibels over the last ten seconds") to the atomspace, instead
+# of the atomspace having to keep all the raw samples.
+#
+# Timestamps are in seconds. Internally, they are kept relative to the
+# first one, so that squaring them does not lose all precision.
+#
+class TimeSeries:
+
+	def __init__(self, capacity=1024, window=10.0):
+		self.capacity = capacity
+		self.window = window
+		self.times = array('d', [0.0]) * capacity
+		self.values = array('d', [0.0]) * capacity
+
+		# Index of the oldest sample, and the number of samples held.
+		self.head = 0
+		self.count = 0
+		self.epoch = None
+
+		# Running sums over the samples held.
+		self.sum_v = 0.0
+		self.sum_vv = 0.0
+		self.sum_t = 0.0
+		self.sum_tt = 0.0
+		self.sum_tv = 0.0
+
+		# Adding and subtracting floats, forever, slowly accumulates
+		# rounding error. Recompute the sums from scratch, now and then.
+		self.until_resum = capacity
+
+	def __len__(self):
+		return self.count
+
+	def push(self, stamp, value):
+		if self.epoch is None:
+			self.epoch = stamp
+		t = stamp - self.epoch
+
+		if self.count == self.capacity:
+			self.drop_oldest()
+
+		idx = (self.head + self.count) % self.capacity
+		self.times[idx] = t
+		self.values[idx] = value
+		self.count += 1
+		self.add(t, value, 1.0)
+
+		# Expire whatever has fallen out of the window.
+		while self.times[self.head] < t - self.window:
+			self.drop_oldest()
+
+		self.until_resum -= 1
+		if self.until_resum <= 0:
+			self.resum()
+
+	def drop_oldest(self):
+		self.add(self.times[self.head], self.values[self.head], -1.0)
+		self.head = (self.head + 1) % self.capacity
+		self.count -= 1
+
+	def add(self, t, v, sign):
+		self.sum_v += sign * v
+		self.sum_vv += sign * v * v
+		self.sum_t += sign * t
+		self.sum_tt += sign * t * t
+		self.sum_tv += sign * t * v
+
+	def resum(self):
+		self.sum_v = self.sum_vv = 0.0
+		self.sum_t = self.sum_tt = self.sum_tv = 0.0
+		for i in range(self.count):
+			idx = (self.head + i) % self.capacity
+			self.add(self.times[idx], self.values[idx], 1.0)
+		self.until_resum = self.capacity
+
+	# ------------------------------------------------------------
+	# Statistics over the samples in the window. These return None
+	# if there is not enough data.
+
+	def latest(self):
+		if 0 == self.count:
+			return None
+		return self.values[(self.head + self.count - 1) % self.capacity]
+
+	def mean(self):
+		if 0 == self.count:
+			return None
+		return self.sum_v / self.count
+
+	def variance(self):
+		if 0 == self.count:
+			return None
+		mean = self.sum_v / self.count
+		return max(0.0, self.sum_vv / self.count - mean * mean)
+
+	def stddev(self):
+		var = self.variance()
+		if var is None:
+			return None
+		return math.sqrt(var)
+
+	# Least-squares slope of value against time: units per second.
+	def trend(self):
+		n = self.count
+		if n < 2:
+			return None
+		denom = n * self.sum_tt - self.sum_t * self.sum_t
+		if denom <= 0.0:
+			return None
+		return (n * self.sum_tv - self.sum_t * self.sum_v) / denom
+
+	# The samples in the window, oldest first, as (timestamp, value)
+	# pairs. This is O(n); it is meant for debugging and logging.
+	def samples(self):
+		out = []
+		for i in range(self.count):
+			idx = (self.head + i) % self.capacity
+			out.append((self.times[idx] + self.epoch, self.values[idx]))
+		return out
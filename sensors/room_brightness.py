@@ -17,8 +17,12 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
+import time
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe, get_param
+from deadband import Deadband
+from ring_buffer import TimeSeries
+from smoothing import RateCap
 
 # XXX defined in HEAD/src/vision/room_luminance/msg
 from room_luminance.msg import Luminance
@@ -30,9 +34,30 @@ from room_luminance.msg import Luminance
 '''
 
 class RoomBrightness:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber('/opencog/room_luminance', Luminance, self.bright_cb)
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+
+		# Room lighting changes slowly; don't resend the same value.
+		self.deadband = Deadband()
+		self.deadband.configure("luminance",
+			**get_param("deadband/luminance", {"epsilon": 1.0}))
+
+		# Recent brightness, and how often to send its trend.
+		history = get_param("history/luminance", {})
+		self.history = TimeSeries(history.get("capacity", 1024),
+			history.get("window", 10.0))
+		self.summary_cap = RateCap(history.get("summary_rate", 1.0))
+
+		subscribe('/opencog/room_luminance', Luminance, self.bright_cb)
 
 	def bright_cb(self, data):
-		self.atomo.room_brightness(data.value)
+		if self.deadband.allow("luminance", data.value):
+			self.atomo.room_brightness(data.value)
+
+		now = time.time()
+		self.history.push(now, data.value)
+		trend = self.history.trend()
+		if trend is not None and self.summary_cap.ready(now):
+			self.atomo.room_brightness_trend(trend)
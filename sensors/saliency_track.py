@@ -17,8 +17,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import rospy
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe, get_param
+from deadband import Deadband
 
 # XXX defined in head/src/vision/ros_nmpt_saliency
 from ros_nmpt_saliency.msg import targets
@@ -29,9 +30,18 @@ from ros_nmpt_saliency.msg import targets
 '''
 
 class SaliencyTrack:
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber('/nmpt_saliency_point', targets, self.sal_cb)
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+
+		# Ignore jitter of the salient point (in normalized image
+		# coordinates) and its degree.
+		self.deadband = Deadband()
+		self.deadband.configure("saliency",
+			**get_param("deadband/saliency", {"epsilon": 0.02}))
+
+		subscribe('/nmpt_saliency_point', targets, self.sal_cb)
 
 	def sal_cb(self, data):
 		loc = data.positions[0]
@@ -39,5 +49,6 @@ class SaliencyTrack:
 		x=1.0
 		y=-1.0*(loc.x*2.0-1.0)
 		#print "locations x="+str(x)+" y="+str(y)+" z="+str(z)+"\n"
-		self.atomo.saliency(x,y,z,data.degree)
+		if self.deadband.allow("saliency", (x, y, z, data.degree)):
+			self.atomo.saliency(x,y,z,data.degree)
 
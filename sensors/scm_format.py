@@ -0,0 +1,106 @@
+#
+# scm_format.py - Formatting values for scheme snippets.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import numbers
+
+# The Atomese snippets are plain %-format strings (see atomic_msgs.py),
+# such as
+#
+#    '(map-sound %s %s %s)\n'
+#
+# with every value passed through one of the two functions below first:
+#
+#   format_number -- writes a number so that guile reads back exactly
+#           the same value.  This is *not* what str() does for floats
+#           in python-2 (it rounds to 12 digits).
+#   escape_string -- the contents of a scheme string. Quotes,
+#           backslashes and newlines are escaped, so that an utterance
+#           like `she said "hi"` does not break the snippet. The format
+#           string must supply the surrounding double-quotes.
+#
+# Anything else (e.g. other snippets) is pasted in as-is.
+
+# How guile spells the floats that repr() spells "nan", "inf", "-inf".
+NONFINITE = {"nan": "+nan.0", "inf": "+inf.0", "-inf": "-inf.0"}
+
+def format_number(value):
+	# The common case: plain python floats and ints.
+	kind = type(value)
+	if kind is float:
+		# repr() is the shortest string that reads back as the same
+		# float. Finite floats always end in a digit.
+		text = repr(value)
+		if text[-1] not in "nf":
+			return text
+		return NONFINITE[text]
+	if kind is int or kind is long:
+		return str(value)
+
+	# Everything else: numpy scalars, and such. bool is a subclass of
+	# int; write it as 0.0 or 1.0, instead.
+	if isinstance(value, numbers.Integral) and not isinstance(value, bool):
+		return str(int(value))
+	return format_number(float(value))
+
+def escape_string(text):
+	if not isinstance(text, basestring):
+		text = str(text)
+
+	# Most utterances have nothing that needs escaping. Four scans
+	# for a single character are cheaper than one regex search.
+	if '"' not in text and "\\" not in text and \
+	   "\n" not in text and "\r" not in text:
+		return text
+	return text.replace("\\", "\\\\").replace('"', '\\"') \
+	           .replace("\n", "\\n").replace("\r", "\\r")
+
+# Does the snippet have balanced parentheses, and no unterminated
+# string?  The cogserver shell reads until the expression is complete,
+# so one snippet that is not would swallow every snippet after it, on
+# that connection.  The snippets in atomic_msgs.py are balanced by
+# construction; this is for scheme text that comes from elsewhere (see
+# AtomicMsgs.evaluate_scm()).  Comments and character literals such
+# as #\( are skipped.
+def balanced(text):
+	depth = 0
+	i = 0
+	n = len(text)
+	while i < n:
+		c = text[i]
+		if c == '"':
+			i += 1
+			while i < n and text[i] != '"':
+				if text[i] == "\\":
+					i += 1
+				i += 1
+			if n <= i:
+				return False
+		elif c == ";":
+			while i < n and text[i] != "\n":
+				i += 1
+		elif c == "#" and text[i+1:i+2] == "\\":
+			i += 2
+		elif c == "(":
+			depth += 1
+		elif c == ")":
+			depth -= 1
+			if depth < 0:
+				return False
+		i += 1
+	return 0 == depth
@@ -0,0 +1,116 @@
+#
+# smoothing.py - Noise filters for 3D sensor locations.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import time
+from collections import deque
+
+# Filters that take a stream of noisy (x, y, z) locations, such as the
+# ManyEars sound-source poses, and return a steadier estimate. Each
+# filter has an `update(point)` method, that takes the newest point
+# and returns the current estimate, as an (x, y, z) tuple.
+#
+# See make_filter() for how to pick one by name.
+
+# No filtering at all; the estimate is the latest point.
+class NoFilter:
+	def update(self, point):
+		return tuple(point)
+
+# Exponential moving average. `alpha` is the weight of the newest
+# point: 1.0 is no smoothing, small values are heavy smoothing.
+class EmaFilter:
+	def __init__(self, alpha=0.3):
+		self.alpha = alpha
+		self.estimate = None
+
+	def update(self, point):
+		if self.estimate is None:
+			self.estimate = tuple(point)
+		else:
+			a = self.alpha
+			self.estimate = tuple(a * p + (1.0 - a) * e
+				for (p, e) in zip(point, self.estimate))
+		return self.estimate
+
+# Median of the last `size` points, taken separately on each axis.
+# Unlike the average, this ignores the occasional wild outlier, such
+# as a door slamming on the far side of the room.
+class MedianFilter:
+	def __init__(self, size=5):
+		self.points = deque(maxlen=size)
+
+	def update(self, point):
+		self.points.append(tuple(point))
+		mid = len(self.points) // 2
+		return tuple(sorted(axis)[mid] for axis in zip(*self.points))
+
+# A Kalman filter for a sound source that sits still, or wanders
+# slowly: on each axis, a random walk with `process_noise` variance
+# per update, seen through `measurement_noise` variance.
+class KalmanFilter:
+	def __init__(self, process_noise=0.001, measurement_noise=0.05):
+		self.q = process_noise
+		self.r = measurement_noise
+		self.estimate = None
+		self.variance = None
+
+	def update(self, point):
+		if self.estimate is None:
+			self.estimate = list(point)
+			self.variance = [self.r] * len(self.estimate)
+			return tuple(self.estimate)
+
+		for i in range(len(self.estimate)):
+			p = self.variance[i] + self.q
+			gain = p / (p + self.r)
+			self.estimate[i] += gain * (point[i] - self.estimate[i])
+			self.variance[i] = (1.0 - gain) * p
+		return tuple(self.estimate)
+
+FILTERS = {
+	"none" : NoFilter,
+	"ema" : EmaFilter,
+	"median" : MedianFilter,
+	"kalman" : KalmanFilter,
+}
+
+# Create a filter by name, passing on any filter-specific parameters,
+# e.g. make_filter("ema", alpha=0.2).
+def make_filter(name, **params):
+	if name not in FILTERS:
+		raise ValueError("Unknown filter '%s'; expecting one of %s" %
+			(name, ", ".join(sorted(FILTERS))))
+	return FILTERS[name](**params)
+
+# Limit how often something happens. `ready()` returns True, at most
+# `max_rate` times per second. A max_rate of zero means no limit.
+class RateCap:
+	def __init__(self, max_rate=0.0):
+		self.interval = 0.0
+		if 0 < max_rate:
+			self.interval = 1.0 / max_rate
+		self.last = None
+
+	def ready(self, now=None):
+		if now is None:
+			now = time.time()
+		if self.last is not None and now - self.last < self.interval:
+			return False
+		self.last = now
+		return True
@@ -17,27 +17,76 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
 
-import rospy
+import numpy
+import time
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe, get_param, has_param
+from smoothing import make_filter, RateCap
 from geometry_msgs.msg import PoseStamped # for sound localization
 
+# Convert ManyEars coordinates to camera coordinates, using an affine
+# matrix (which combines a rotation and translation).
+#
+# A typical mapping matrix looks like this:
+#
+#   0.943789   0.129327   0.304204 0.00736024
+#   -0.131484   0.991228 -0.0134787 0.00895614
+#   -0.303278 -0.0272767   0.952513  0.0272001
+#   0          0          0          1
+#
+# `matrix` is the transpose of that, as a numpy array (see
+# mapping_matrix() below), and `points` is an N x 4 array of
+# homogeneous coordinates: one (x, y, z, 1) row per pose. All N poses
+# are transformed at once, and an N x 3 array is returned.
+def transform_poses(matrix, points):
+	return numpy.dot(points, matrix)[:, :3]
+
+# Convert the mapping-matrix ROS parameter (a list of rows) into the
+# form that transform_poses() wants.  The bottom row may be left out.
+def mapping_matrix(rows):
+	mat = numpy.array(rows, dtype=float)
+	if mat.shape == (3, 4):
+		mat = numpy.vstack([mat, [0.0, 0.0, 0.0, 1.0]])
+	if mat.shape != (4, 4):
+		raise ValueError("Sound mapping matrix must be 4x4, not %s" %
+			str(mat.shape))
+	return mat.T
+
 # Thin python wrapper, to subscribe to ManyEars sound-source ROS
 # messages, and then re-wrap these as opencog atoms, via AtomicMsgs,
 # and forward them on into the OpenCog space-time server.
 #
 class SoundTrack:
 
-	def __init__(self):
+	def __init__(self, atomo=None):
 
 		# The OpenCog API. This is used to send sound localization
 		# data to OpenCog.
-		self.atomo = AtomicMsgs()
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
 
 		# Sound localization
 		parameter_name = "sound_localization/mapping_matrix"
-		if rospy.has_param(parameter_name):
-			self.sl_matrix = rospy.get_param(parameter_name)
-			rospy.Subscriber("/manyears/source_pose", PoseStamped, \
+		if has_param(parameter_name):
+			self.sl_matrix = mapping_matrix(get_param(parameter_name))
+
+			# Poses can be collected into a window, transformed all
+			# at once, and sent as a single (averaged) location. A
+			# window of one sends every pose.
+			window = get_param("sound_localization/window", 1)
+			self.window = numpy.ones((max(1, window), 4))
+			self.npose = 0
+
+			# ManyEars is jittery. Smooth the locations, and send no
+			# more than `max_rate` of them per second (see smoothing.py).
+			self.filter = make_filter(
+				get_param("sound_localization/filter", "none"),
+				**get_param("sound_localization/filter_params", {}))
+			self.rate_cap = RateCap(
+				get_param("sound_localization/max_rate", 0.0))
+
+			subscribe("/manyears/source_pose", PoseStamped, \
 				self.sound_cb)
 			print "Sound localization is enabled"
 		else :
@@ -48,26 +97,19 @@ class SoundTrack:
 	# OpenCog space server.  This data arrives at a rate of about
 	# 30 Hz, currently, from ManyEars.
 	def sound_cb(self, msg):
-		# Convert to camera coordinates, using an affine matrix
-		# (which combines a rotation and translation).
-		#
-		# A typical sl_matrix looks like this:
-		#
-		#   0.943789   0.129327   0.304204 0.00736024
-		#   -0.131484   0.991228 -0.0134787 0.00895614
-		#   -0.303278 -0.0272767   0.952513  0.0272001
-		#   0          0          0          1
-		#
-		vs = [msg.pose.position.x, \
-		      msg.pose.position.y, \
-		      msg.pose.position.z, \
-		      1]
-
-		r = [0, 0, 0, 0]
-		for i in range(0,3):
-			for j in range(0,3):
-				r[i] += self.sl_matrix[i][j] * vs[j]
+		pose = self.window[self.npose]
+		pose[0] = msg.pose.position.x
+		pose[1] = msg.pose.position.y
+		pose[2] = msg.pose.position.z
+		self.npose += 1
+		if self.npose < len(self.window):
+			return
+		self.npose = 0
 
-		self.atomo.update_sound(r[0], r[1], r[2])
+		r = transform_poses(self.sl_matrix, self.window).mean(axis=0)
+		x, y, z = self.filter.update((float(r[0]), float(r[1]), float(r[2])))
+		now = time.time()
+		if self.rate_cap.ready(now):
+			self.atomo.update_sound(x, y, z)
 
 	# ----------------------------------------------------------
@@ -0,0 +1,79 @@
+#
+# subscribe.py - Subscribe to ROS topics, with instrumented callbacks.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import copy
+import rospy
+from metrics import METRICS
+
+# All of the sensor bridges subscribe to their topics, and read their
+# ROS params, through here, rather than calling rospy directly, so that:
+#
+#  * every callback is counted and timed (see metrics.py), under the
+#    name of its topic;
+#  * a session can be recorded: every inbound message, and every param
+#    read, is passed to the `recorder`, if one is set (see recorder.py);
+#  * a recorded session can be replayed offline, without a ROS master:
+#    after go_offline(), nothing is subscribed to, the params come from
+#    the recording, and replay.py hands the messages to deliver().
+
+recorder = None
+offline_params = None
+handlers = {}
+
+def set_recorder(rec):
+	global recorder
+	recorder = rec
+
+def go_offline(params):
+	global offline_params
+	offline_params = params
+
+def subscribe(topic, msg_type, callback, **kwargs):
+	timed = METRICS.timed(topic, callback)
+	def handler(msg):
+		if recorder:
+			recorder.record(topic, msg)
+		return timed(msg)
+
+	if offline_params is not None:
+		handlers.setdefault(topic, []).append(handler)
+		return None
+	return rospy.Subscriber(topic, msg_type, handler, **kwargs)
+
+# Pass a replayed message to everyone subscribed to its topic.
+# Returns False if no one is.
+def deliver(topic, msg):
+	for handler in handlers.get(topic, []):
+		handler(msg)
+	return topic in handlers
+
+def get_param(name, default=None):
+	if offline_params is not None:
+		# Copied, because some bridges modify the dicts they get.
+		value = copy.deepcopy(offline_params.get(name, default))
+	else:
+		value = rospy.get_param(name, default)
+	if recorder:
+		recorder.param(name, value)
+	return value
+
+def has_param(name):
+	if offline_params is not None:
+		return name in offline_params
+	return rospy.has_param(name)
@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+#
+# supervisor.py - Run the sensor bridges in several worker processes.
+# Copyright (C) 2017  Linas Vepstas
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License v3 as
+# published by the Free Software Foundation and including the exceptions
+# at http://opencog.org/wiki/Licenses
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program; if not, write to:
+# Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import os
+import signal
+import subprocess
+import sys
+import time
+import rospy
+
+# main.py runs every bridge in one python process, and so under one
+# GIL: a burst of face locations holds up the chat text and the TTS
+# events.  This runs the bridges in several processes instead ("shards"),
+# each of which is just main.py, under its own node name, with the
+# `~bridges` param set to its share of the bridges. Each has its own
+# connections to the cogserver.
+#
+# The high-rate bridges get a process each; the low-rate control
+# bridges share one. This can be changed with the `~shards` param,
+# a dict of shard name to list of bridge names (see bridges.py).
+#
+# All other private params of the supervisor (`~cogserver_host`,
+# `~batch_interval` and so on; see main.py) are copied to every
+# worker.  `~metrics_file` and `~record` get the shard name appended,
+# so that the workers do not overwrite one another's files.
+#
+# A worker that exits is restarted, after a delay that doubles with
+# every quick failure (from `~min_backoff` up to `~max_backoff`
+# seconds), and is reset once it has stayed up for `~stable_time`.
+#
+#    rosrun ... supervisor.py _batch_interval:=0.02
+#
+DEFAULT_SHARDS = {
+	"faces" : ["face_track"],
+	"sound" : ["sound_track"],
+	"audio" : ["audio_power"],
+	"saliency" : ["saliency_track"],
+	"control" : ["control", "control_psi", "affect", "chat_track",
+		"face_recog", "room_brightness", "tts_feedback"],
+}
+
+# Supervisor settings, not passed on to the workers.
+OWN_PARAMS = ["shards", "min_backoff", "max_backoff", "stable_time"]
+
+# Worker params that name files, and so must differ between workers.
+PER_WORKER_FILES = ["metrics_file", "record"]
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+class Worker:
+	def __init__(self, node_name, bridges, params, min_backoff, max_backoff,
+	             stable_time):
+		self.node_name = node_name
+		self.bridges = bridges
+		self.params = params
+		self.min_backoff = min_backoff
+		self.max_backoff = max_backoff
+		self.stable_time = stable_time
+
+		self.backoff = min_backoff
+		self.proc = None
+		self.started = 0.0
+		self.next_start = 0.0
+		self.restarts = 0
+
+	# The worker runs in the same namespace as the supervisor, so that
+	# its private params are found under, e.g., /robot/<node_name>/.
+	# The namespace is passed on explicitly, in case the supervisor got
+	# it from a `__ns:=` argument rather than from ROS_NAMESPACE.
+	def start(self):
+		namespace = rospy.get_namespace()
+		ns = namespace + self.node_name + "/"
+		for (name, value) in self.params.items():
+			rospy.set_param(ns + name, value)
+		rospy.set_param(ns + "bridges", self.bridges)
+
+		self.proc = subprocess.Popen([sys.executable, MAIN,
+			"__name:=" + self.node_name, "__ns:=" + namespace])
+		self.started = time.time()
+		rospy.loginfo("Started %s (pid %d): %s", self.node_name,
+			self.proc.pid, ", ".join(self.bridges))
+
+	# Restart the worker, if it has died, and its backoff has expired.
+	def check(self):
+		now = time.time()
+		if self.proc is not None:
+			status = self.proc.poll()
+			if status is None:
+				if self.stable_time <= now - self.started:
+					self.backoff = self.min_backoff
+				return
+			rospy.logwarn("%s exited with status %d; restarting in %.1f sec",
+				self.node_name, status, self.backoff)
+			self.proc = None
+			self.next_start = now + self.backoff
+			self.backoff = min(2.0 * self.backoff, self.max_backoff)
+
+		if self.next_start <= now:
+			self.restarts += 1
+			self.start()
+
+	# Ask the worker to shut down; kill it if it won't.
+	def stop(self, timeout=5.0):
+		if self.proc is None or self.proc.poll() is not None:
+			return
+		self.proc.send_signal(signal.SIGINT)
+		deadline = time.time() + timeout
+		while self.proc.poll() is None and time.time() < deadline:
+			time.sleep(0.1)
+		if self.proc.poll() is None:
+			self.proc.kill()
+			self.proc.wait()
+
+def worker_params(shard):
+	params = {}
+	for (name, value) in rospy.get_param("~", {}).items():
+		if name in OWN_PARAMS:
+			continue
+		if name in PER_WORKER_FILES and value:
+			value = value + "." + shard
+		params[name] = value
+	return params
+
+def main():
+	rospy.init_node("OpenCog_ROS_bridge_supervisor")
+	shards = rospy.get_param("~shards", DEFAULT_SHARDS)
+	min_backoff = rospy.get_param("~min_backoff", 1.0)
+	max_backoff = rospy.get_param("~max_backoff", 60.0)
+	stable_time = rospy.get_param("~stable_time", 60.0)
+
+	workers = []
+	for (shard, bridges) in sorted(shards.items()):
+		worker = Worker("OpenCog_ROS_bridge_" + shard, bridges,
+			worker_params(shard), min_backoff, max_backoff, stable_time)
+		worker.start()
+		workers.append(worker)
+
+	def shutdown():
+		for worker in workers:
+			worker.stop()
+	rospy.on_shutdown(shutdown)
+
+	while not rospy.is_shutdown():
+		for worker in workers:
+			worker.check()
+		rospy.sleep(1.0)
+
+if __name__ == "__main__":
+	main()
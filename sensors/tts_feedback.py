@@ -20,6 +20,7 @@
 import rospy
 from std_msgs.msg import String
 from atomic_msgs import AtomicMsgs
+from subscribe import subscribe
 
 '''
     This implements a ROS node that subscribes to the `speech_events`
@@ -32,9 +33,11 @@ from atomic_msgs import AtomicMsgs
 class TTSFeedback:
 	# Receive messages that indicate that TTS (or chatbot) has started
 	# or finished vocalizing.
-	def __init__(self):
-		self.atomo = AtomicMsgs()
-		rospy.Subscriber("speech_events", String, self.speech_event_cb)
+	def __init__(self, atomo=None):
+		if atomo is None:
+			atomo = AtomicMsgs()
+		self.atomo = atomo
+		subscribe("speech_events", String, self.speech_event_cb)
 
 	# Notification from text-to-speech (TTS) module, that it has
 	# started, or stopped vocalizing.  This message might be published